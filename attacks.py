@@ -0,0 +1,118 @@
+from position import Position
+
+
+# offsets for the pieces that move a single step at a time
+knight_offsets = [(-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1)]
+king_offsets = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+
+# named directions for the sliding pieces
+directions = {'N': (-1, 0), 'NE': (-1, 1), 'E': (0, 1), 'SE': (1, 1),
+              'S': (1, 0), 'SW': (1, -1), 'W': (0, -1), 'NW': (-1, -1)}
+rook_directions = ['N', 'E', 'S', 'W']
+bishop_directions = ['NE', 'SE', 'SW', 'NW']
+queen_directions = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+
+# directions which move towards higher square indices, where the nearest blocker is the lowest set bit
+increasing_directions = {'E', 'SE', 'S', 'SW'}
+
+
+def step_targets(sq, offsets):
+    """Gets every position a single step away from a square in each of the given offsets"""
+    r, c = sq // 8, sq % 8
+    return [Position(r + dr, c + dc) for dr, dc in offsets if 0 <= r + dr <= 7 and 0 <= c + dc <= 7]
+
+
+def ray_targets(sq, direction):
+    """Gets every position along a ray from a square to the edge of the board, nearest first"""
+    dr, dc = directions[direction]
+    r, c = sq // 8 + dr, sq % 8 + dc
+    targets = []
+    while 0 <= r <= 7 and 0 <= c <= 7:
+        targets.append(Position(r, c))
+        r += dr
+        c += dc
+    return targets
+
+
+def to_mask(targets):
+    """Converts a list of positions into a mask with bit r * 8 + c set for each"""
+    mask = 0
+    for target in targets:
+        mask |= 1 << (target.r * 8 + target.c)
+    return mask
+
+
+# per-square tables of the positions each piece can reach on an empty board, built once at import
+knight_targets = [step_targets(sq, knight_offsets) for sq in range(64)]
+king_targets = [step_targets(sq, king_offsets) for sq in range(64)]
+rays = {direction: [ray_targets(sq, direction) for sq in range(64)] for direction in directions}
+
+# the same tables as bitboard masks
+knight_masks = [to_mask(targets) for targets in knight_targets]
+king_masks = [to_mask(targets) for targets in king_targets]
+ray_masks = {direction: [to_mask(targets) for targets in rays[direction]] for direction in directions}
+pawn_masks = {True: [to_mask(step_targets(sq, [(-1, -1), (-1, 1)])) for sq in range(64)],
+              False: [to_mask(step_targets(sq, [(1, -1), (1, 1)])) for sq in range(64)]}
+
+
+def slide_attacks(sq, occupied, slide_directions):
+    """Calculates a mask of every tile a sliding piece can reach from a square in the given directions.
+    Each ray stops at and includes the first occupied tile it meets"""
+    attacks = 0
+    for direction in slide_directions:
+        ray = ray_masks[direction][sq]
+        blockers = ray & occupied
+        if blockers:
+            # find the nearest blocker and cut off the part of the ray hidden behind it
+            if direction in increasing_directions:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= ray_masks[direction][blocker]
+        attacks |= ray
+    return attacks
+
+
+def build_between_masks():
+    """Calculates a mask of the tiles strictly between every pair of squares that share a row, column or diagonal.
+    Walking each ray once and collecting the tiles passed so far is much faster than searching for every pair"""
+    masks = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for direction in directions:
+            mask = 0
+            for target in rays[direction][a]:
+                b = target.r * 8 + target.c
+                masks[a][b] = mask
+                mask |= 1 << b
+    return masks
+
+
+# masks of the tiles between every pair of squares, used to block checks from sliding pieces
+between_masks = build_between_masks()
+
+
+def build_ray_directions():
+    """Finds the direction of the ray from every square to every other square it lies on, or None if it lies on none"""
+    found = [[None] * 64 for _ in range(64)]
+    for a in range(64):
+        for direction in directions:
+            for target in rays[direction][a]:
+                found[a][target.r * 8 + target.c] = direction
+    return found
+
+
+# the direction from one square to another, used to update only the ray of a slider that passes through a tile
+ray_directions = build_ray_directions()
+
+
+def ray_attacks(sq, occupied, direction):
+    """Calculates a mask of every tile reachable along a single ray, stopping at and including the first blocker"""
+    ray = ray_masks[direction][sq]
+    blockers = ray & occupied
+    if blockers:
+        if direction in increasing_directions:
+            blocker = (blockers & -blockers).bit_length() - 1
+        else:
+            blocker = blockers.bit_length() - 1
+        ray ^= ray_masks[direction][blocker]
+    return ray
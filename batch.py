@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from board import Board
+from fen import read_fen, move_name
+from evaluate import evaluate
+from search import Search
+from movecache import MoveCache
+
+
+# the analyses that can be run on each position
+task_names = ['moves', 'eval', 'search']
+
+# the search used by a worker process, created once when the worker starts so its hash table is reused.
+# workers which never search don't have one, so they don't allocate a hash table
+worker_search = None
+# the moves of positions a worker has already seen, since inputs often repeat positions
+worker_moves = MoveCache()
+
+
+def init_worker(hash_mb, tasks):
+    global worker_search
+    worker_search = Search(hash_mb=hash_mb) if 'search' in tasks else None
+
+
+def read_position(line):
+    """Reads a position written either as FEN or as a board string encoding, which never contains a slash"""
+    if '/' in line:
+        return read_fen(line)
+    fields = line.split()
+    return Board(fields[0], len(fields) < 2 or fields[1] != 'b')
+
+
+def analyse_position(line, tasks, depth, movetime):
+    """Runs the requested analyses on a single position and returns the results as a dictionary"""
+    result = {'position': line}
+    try:
+        board = read_position(line)
+    except (ValueError, IndexError, KeyError) as e:
+        result['error'] = f'unreadable position: {e}'
+        return result
+
+    if 'moves' in tasks:
+        result['moves'] = [move_name(move) for move in worker_moves.moves(board)]
+    if 'eval' in tasks:
+        result['eval'] = evaluate(board)
+    if 'search' in tasks:
+        search = worker_search if worker_search is not None else Search()
+        # each position starts from an empty table so results don't depend on which worker ran it.
+        # a short search only fills a few slots, so emptying them is far quicker than the search itself
+        search.table.clear()
+        found = search.search(board, max_depth=depth, time_limit=movetime)
+        result['best'] = move_name(found.move) if found.move is not None else None
+        result['score'] = found.score
+        result['depth'] = found.depth
+        result['pv'] = [move_name(move) for move in found.pv]
+        result['nodes'] = found.nodes
+
+    return result
+
+
+def analyse_chunk(lines, tasks, depth, movetime):
+    """Analyses a chunk of positions, returning a line of JSON for each"""
+    return [json.dumps(analyse_position(line, tasks, depth, movetime)) for line in lines]
+
+
+def read_chunks(lines, chunk_size):
+    """Groups the non-empty lines of an input into chunks"""
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(lines, out, tasks=('moves',), workers=None, chunk_size=64, depth=3, movetime=None, hash_mb=16):
+    """Analyses every position in an iterable of lines across a pool of worker processes and writes a line of JSON
+    for each to out, in the same order as the input. Only a few chunks per worker are in flight at once, so the
+    input is streamed rather than read into memory. Returns the number of positions analysed"""
+    count = 0
+
+    # a single worker runs in this process, which is simpler to debug
+    if workers == 1:
+        init_worker(hash_mb, tasks)
+        for chunk in read_chunks(lines, chunk_size):
+            for result in analyse_chunk(chunk, tasks, depth, movetime):
+                out.write(result + '\n')
+            count += len(chunk)
+        return count
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(hash_mb, tasks)) as executor:
+        pending = deque()
+
+        for chunk in read_chunks(lines, chunk_size):
+            pending.append(executor.submit(analyse_chunk, chunk, tasks, depth, movetime))
+            # write out the oldest chunk before taking on more, which keeps the output in order
+            while len(pending) >= max_pending:
+                count += write_results(pending.popleft().result(), out)
+        while pending:
+            count += write_results(pending.popleft().result(), out)
+
+    return count
+
+
+def write_results(results, out):
+    for result in results:
+        out.write(result + '\n')
+    return len(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse a file of positions, one FEN or board string encoding per '
+                                                 'line, across every core and write a line of JSON for each')
+    parser.add_argument('input', help='the file of positions, or - for stdin')
+    parser.add_argument('output', help='the file to write results to, or - for stdout')
+    parser.add_argument('--tasks', default='moves', help=f'a comma separated list of {", ".join(task_names)}')
+    parser.add_argument('--workers', type=int, default=None, help='the number of worker processes, every core by '
+                                                                  'default')
+    parser.add_argument('--chunk-size', type=int, default=64, help='the number of positions sent to a worker at once')
+    parser.add_argument('--depth', type=int, default=3, help='the depth to search to')
+    parser.add_argument('--movetime', type=float, default=None, help='the seconds to search each position for')
+    parser.add_argument('--hash', type=float, default=16, metavar='MB', help='the hash table size of each worker')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='count calls, moves and time in each move generator and write them to a JSON file, or '
+                             'as folded stacks if the path ends with .folded. Runs in a single process')
+    args = parser.parse_args(argv)
+
+    tasks = args.tasks.split(',')
+    for task in tasks:
+        if task not in task_names:
+            parser.error(f'unknown task {task}')
+
+    # the counters live in this process, so profiling keeps every position in it
+    profiler = None
+    workers = args.workers
+    if args.profile:
+        from profiler import Profiler
+        profiler = Profiler()
+        profiler.enable()
+        workers = 1
+
+    infile = sys.stdin if args.input == '-' else open(args.input, 'r')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        count = run_batch(infile, outfile, tasks, workers, args.chunk_size, args.depth, args.movetime, args.hash)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+        if profiler is not None:
+            profiler.disable()
+            profiler.write(args.profile)
+
+    print(f'analysed {count} positions', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+from position import positions
+from move import Move
+from attacks import knight_masks, king_masks, pawn_masks, slide_attacks, rook_directions, bishop_directions, \
+                    queen_directions
+
+
+# every piece code, light pieces first, in the order the bitboards are stored
+piece_codes: str = 'PNBRQKpnbrqk'
+light_codes: str = 'PNBRQK'
+dark_codes: str = 'pnbrqk'
+
+
+def square(pos):
+    """Converts a position into a square index. Square n is at row n // 8 and column n % 8"""
+    return pos.r * 8 + pos.c
+
+
+def to_position(sq):
+    """Converts a square index back into a position"""
+    return positions[sq]
+
+
+def iterate_bits(mask):
+    """Yields the square index of every bit that is set in a mask, lowest first"""
+    while mask:
+        # isolate the lowest set bit
+        lsb = mask & -mask
+        yield lsb.bit_length() - 1
+        mask ^= lsb
+
+
+def knight_attacks(sq):
+    return knight_masks[sq]
+
+
+def king_attacks(sq):
+    return king_masks[sq]
+
+
+def rook_attacks(sq, occupied):
+    return slide_attacks(sq, occupied, rook_directions)
+
+
+def bishop_attacks(sq, occupied):
+    return slide_attacks(sq, occupied, bishop_directions)
+
+
+def queen_attacks(sq, occupied):
+    return slide_attacks(sq, occupied, queen_directions)
+
+
+def pawn_attacks(sq, isLight):
+    return pawn_masks[isLight][sq]
+
+
+def piece_attacks(code, sq, occupied):
+    """Calculates a mask of every tile the piece with a code attacks from a square, given the occupancy of the board"""
+    kind = code.upper()
+    if kind == 'P':
+        return pawn_masks[code == 'P'][sq]
+    if kind == 'N':
+        return knight_masks[sq]
+    if kind == 'K':
+        return king_masks[sq]
+    if kind == 'B':
+        return slide_attacks(sq, occupied, bishop_directions)
+    if kind == 'R':
+        return slide_attacks(sq, occupied, rook_directions)
+    return slide_attacks(sq, occupied, queen_directions)
+
+
+class BitBoard:
+    """A class for representing an entire board state as a set of 64 bit integers.
+    Stores one mask per piece code along with occupancy masks for each color and the board as a whole.
+    Rook and pawn state is stored as masks of the squares holding rooks or pawns with that state"""
+
+    def __init__(self):
+        # one mask for each type and color of piece
+        self.pieces = {code: 0 for code in piece_codes}
+        # occupancy masks
+        self.light = 0
+        self.dark = 0
+        self.occupied = 0
+        # pawns that have just moved two tiles and pawns that may still capture with en passant
+        self.en_passant = 0
+        self.can_ep_cap = 0
+        # rooks that are still able to castle
+        self.can_castle = 0
+
+    def __eq__(self, __o):
+        return self.pieces == __o.pieces and self.en_passant == __o.en_passant and \
+               self.can_ep_cap == __o.can_ep_cap and self.can_castle == __o.can_castle
+
+    def __str__(self):
+        out = ''
+        for r in range(8):
+            for c in range(8):
+                code = self.piece_at(r * 8 + c)
+                out += '.' if code is None else code
+            out += '\n'
+        return out
+
+    def __repr__(self):
+        return self.__str__()
+
+    def place(self, code, sq):
+        """Places a piece on an empty square"""
+        bit = 1 << sq
+        self.pieces[code] |= bit
+        if code.isupper():
+            self.light |= bit
+        else:
+            self.dark |= bit
+        self.occupied |= bit
+
+    def remove(self, sq):
+        """Removes whichever piece is on a square along with any state attached to it"""
+        keep = ~(1 << sq)
+        for code in piece_codes:
+            self.pieces[code] &= keep
+        self.light &= keep
+        self.dark &= keep
+        self.occupied &= keep
+        self.en_passant &= keep
+        self.can_ep_cap &= keep
+        self.can_castle &= keep
+
+    def piece_at(self, sq):
+        """Gets the code of the piece on a square, or None if it is empty"""
+        bit = 1 << sq
+        if not self.occupied & bit:
+            return None
+        for code in (light_codes if self.light & bit else dark_codes):
+            if self.pieces[code] & bit:
+                return code
+
+    def allies(self, isLight):
+        """Gets the occupancy mask for one color"""
+        return self.light if isLight else self.dark
+
+    def enemies(self, isLight):
+        """Gets the occupancy mask for the opposing color"""
+        return self.dark if isLight else self.light
+
+    def moves_to(self, pos, targets):
+        """Converts a mask of target tiles into a list of moves from a position"""
+        return [Move(pos, to_position(sq)) for sq in iterate_bits(targets)]
+
+    def copy(self):
+        """Creates an independent copy of the bitboards"""
+        bitboards = BitBoard()
+        bitboards.pieces = dict(self.pieces)
+        bitboards.light, bitboards.dark, bitboards.occupied = self.light, self.dark, self.occupied
+        bitboards.en_passant, bitboards.can_ep_cap, bitboards.can_castle = \
+            self.en_passant, self.can_ep_cap, self.can_castle
+        return bitboards
+
+    def make_move(self, move):
+        """Makes a move by mutating the bitboards, following the same rules as Board.make_move.
+        Bitboards are cheap to copy, so moves are taken back by keeping a copy rather than unmaking them"""
+        begin, target = square(move.begin), square(move.target)
+        code = self.piece_at(begin)
+        can_ep_cap = self.can_ep_cap & (1 << begin)
+
+        # the chance to capture the last pawn to move two tiles with en passant has passed
+        self.en_passant = 0
+
+        # remove any captured piece, which is beside the moving pawn for en passant
+        if move.is_ep_cap:
+            self.remove(move.begin.r * 8 + move.target.c)
+        elif self.occupied & (1 << target):
+            self.remove(target)
+
+        # move the piece, or whatever it is promoted to
+        self.remove(begin)
+        self.place(move.promotion or code, target)
+
+        if code in 'pP' and move.promotion is None:
+            # mark a pawn which moved two tiles as capturable with en passant
+            if abs(begin - target) == 16:
+                self.en_passant |= 1 << target
+            # if a pawn captured, it can no longer capture with en passant
+            if can_ep_cap and move.begin.c == move.target.c:
+                self.can_ep_cap |= 1 << target
+        elif code in 'kK':
+            # a king that moves can no longer castle with either rook
+            row = move.begin.r * 8
+            self.can_castle &= ~((1 << row) | (1 << (row + 7)))
+            # when castling, the rook jumps over the king
+            if move.is_castle:
+                rook_begin, rook_target = (row + 7, row + 5) if move.target.c == 6 else (row, row + 3)
+                self.remove(rook_begin)
+                self.place('R' if code == 'K' else 'r', rook_target)
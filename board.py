@@ -1,25 +1,276 @@
-import numpy as np
-from piece import create_piece, Piece, Rook, Pawn
+from position import Position
+from piece import create_piece, Rook, Pawn, King
+from bitboard import BitBoard, iterate_bits, piece_attacks
+from attacks import ray_masks, ray_directions, ray_attacks
+from zobrist import hash_board, tile_key, dark_to_move_key, ep_keys
+
+
+class Grid:
+    """An 8x8 grid of tiles indexed with [r, c] like a 2D array. The tiles are kept in a flat list, row by row,
+    so that a board can be created without loading numpy"""
+
+    __slots__ = ('tiles',)
+
+    def __init__(self, tiles=None):
+        self.tiles = tiles if tiles is not None else [None] * 64
+
+    def __getitem__(self, index):
+        r, c = index
+        # the tiles are flat, so a column or row off the board would otherwise index a tile of another row
+        if not (0 <= r <= 7 and 0 <= c <= 7):
+            raise IndexError(f'({r}, {c}) is not on the board')
+        return self.tiles[r * 8 + c]
+
+    def __setitem__(self, index, piece):
+        r, c = index
+        if not (0 <= r <= 7 and 0 <= c <= 7):
+            raise IndexError(f'({r}, {c}) is not on the board')
+        self.tiles[r * 8 + c] = piece
+
+    def __iter__(self):
+        """Iterates over the rows of the grid"""
+        for r in range(8):
+            yield self.tiles[r * 8:r * 8 + 8]
+
+    def __eq__(self, __o):
+        return isinstance(__o, Grid) and self.tiles == __o.tiles
+
+    def copy(self):
+        return Grid(list(self.tiles))
+
+
+class Undo:
+    """A class for recording everything needed to take back a single move.
+    Only the tiles that a move changes are recorded, rather than a copy of the board.
+    A plain slotted class rather than a dataclass, since one is created for every move and dataclasses is slow
+    to import"""
+
+    __slots__ = ('move', 'en_passant', 'hash', 'changes', 'attacks')
+
+    def __init__(self, move, en_passant, hash, changes=None, attacks=None):
+        self.move = move
+        self.en_passant = en_passant        # the pawn that could be captured with en passant before the move
+        self.hash = hash                    # the zobrist hash before the move
+        self.changes = changes if changes is not None else []  # (r, c, piece) for each changed tile and its piece
+        self.attacks = attacks              # the attack maps before the move, which are restored rather than undone
 
 
 class Board:
     """A class for representing an entire board state. Constructed from and capable of constructing
-    unique string encodings. Stores a board as a 2D numpy array of pieces."""
+    unique string encodings. Stores a board as an 8x8 grid of pieces."""
 
     # string encodings
     default_board: str = 'r1nbqkbnr1p01p01p01p01p01p01p01p01eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeP01P01P01P01P01P01P01P01R1NBQKBNR1'
     empty_board: str = 'eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee'
 
-    def __init__(self, board=default_board):
+    def __init__(self, board=default_board, isLightTurn=True):
         if board == 'empty':
             self.board = self.read_board(self.empty_board)
         else:
             self.board = self.read_board(board)
 
+        # tracks whose turn it is and the moves that have been made so they can be taken back
+        self.isLightTurn = isLightTurn
+        self.history = []
+        # the position of the pawn that can be captured with en passant, so it can be cleared without a search
+        self.ep_square = self.find_en_passant()
+        # the zobrist hash of the position, kept up to date as moves are made
+        self.hash = hash_board(self)
+        # which tiles each player attacks, kept up to date as moves are made
+        self.reset_attacks()
+
+    def reset_attacks(self):
+        """Builds the attack maps from scratch. For every tile, attacks_from holds a mask of the tiles the piece on it
+        attacks. The occupancy of each player, the squares of the sliding pieces and the square of each king are
+        tracked too, so that the maps can be updated as moves are made"""
+        tiles = self.board.tiles
+        self.occupied = 0
+        self.sliders = 0
+        self.colors = {True: 0, False: 0}
+        self.kings = {True: None, False: None}
+        for sq, piece in enumerate(tiles):
+            if piece is not None:
+                self.occupied |= 1 << sq
+                self.colors[piece.isLight] |= 1 << sq
+                if piece.code in 'bBrRqQ':
+                    self.sliders |= 1 << sq
+                elif piece.code in 'kK':
+                    self.kings[piece.isLight] = sq
+
+        self.attacks_from = [0] * 64
+        for sq, piece in enumerate(tiles):
+            if piece is not None:
+                self.attacks_from[sq] = piece_attacks(piece.code, sq, self.occupied)
+        # the tiles each player attacks are combined from attacks_from when first asked for after a move
+        self.attacked_cache = {True: None, False: None}
+
+    def update_attacks(self, sq, old, piece):
+        """Updates the attack maps after the piece on a square has been replaced. Only the square itself and the
+        sliding pieces whose rays reach it can have changed, and those rays only change if the tile was filled or
+        emptied"""
+        bit = 1 << sq
+        if old is not None:
+            self.colors[old.isLight] ^= bit
+            if old.code in 'bBrRqQ':
+                self.sliders ^= bit
+            elif old.code in 'kK':
+                self.kings[old.isLight] = None
+
+        if (old is None) != (piece is None):
+            self.occupied ^= bit
+            # only the sliding pieces which attack the tile can see further or less far past it
+            attacks_from = self.attacks_from
+            sliders = self.sliders
+            while sliders:
+                lsb = sliders & -sliders
+                t = lsb.bit_length() - 1
+                if attacks_from[t] & bit:
+                    # only the ray which passes through the tile changes
+                    direction = ray_directions[t][sq]
+                    attacks_from[t] = attacks_from[t] & ~ray_masks[direction][t] | \
+                        ray_attacks(t, self.occupied, direction)
+                sliders ^= lsb
+
+        if piece is None:
+            self.attacks_from[sq] = 0
+        else:
+            self.attacks_from[sq] = piece_attacks(piece.code, sq, self.occupied)
+            self.colors[piece.isLight] |= bit
+            if piece.code in 'bBrRqQ':
+                self.sliders |= bit
+            elif piece.code in 'kK':
+                self.kings[piece.isLight] = sq
+
+    def attacked(self, byLight):
+        """Gets a mask of every tile attacked by one player"""
+        attacked = self.attacked_cache[byLight]
+        if attacked is None:
+            attacked = 0
+            attacks_from = self.attacks_from
+            pieces = self.colors[byLight]
+            while pieces:
+                lsb = pieces & -pieces
+                attacked |= attacks_from[lsb.bit_length() - 1]
+                pieces ^= lsb
+            self.attacked_cache[byLight] = attacked
+        return attacked
+
+    def is_attacked(self, pos, byLight):
+        """Checks if a tile is attacked by one player"""
+        return bool(self.attacked(byLight) >> (pos.r * 8 + pos.c) & 1)
+
+    def count_attackers(self, pos, byLight):
+        """Counts the pieces of one player attacking a tile"""
+        bit = 1 << (pos.r * 8 + pos.c)
+        return sum(1 for sq in iterate_bits(self.colors[byLight]) if self.attacks_from[sq] & bit)
+
+    def in_check(self, isLight):
+        """Checks if one player's king is attacked"""
+        king = self.kings[isLight]
+        return king is not None and bool(self.attacked(not isLight) >> king & 1)
+
+    def find_en_passant(self):
+        """Find the pawn that has just moved two tiles, if there is one"""
+        for r in range(8):
+            for c in range(8):
+                if isinstance(self.board[r, c], Pawn) and self.board[r, c].en_passant:
+                    return Position(r, c)
+        return None
+
+    def replace(self, undo, r, c, piece):
+        """Put a piece on a tile, recording the piece it replaces and updating the hash"""
+        sq = r * 8 + c
+        # the flat list of tiles is used directly, since this runs for every tile of every move
+        tiles = self.board.tiles
+        old = tiles[sq]
+        undo.changes.append((r, c, old))
+        tiles[sq] = piece
+        self.hash ^= tile_key(old, sq) ^ tile_key(piece, sq)
+        # a piece that only changes state attacks the same tiles
+        if old is None or piece is None or old.code != piece.code:
+            self.update_attacks(sq, old, piece)
+
+    def make_move(self, move):
+        """Make a move by mutating the board state. Only the tiles involved in the move are touched, and
+        every tile the move changes is pushed onto the history so that it can be taken back.
+        Pieces are immutable, so a piece whose state changes is replaced with the piece for its new state"""
+        begin, target = move.begin, move.target
+        piece = self.board[begin.r, begin.c]
+        undo = Undo(move, self.ep_square, self.hash)
+        self.hash ^= dark_to_move_key
+
+        # the attack maps are copied rather than undone, since putting them back is much faster than updating them
+        undo.attacks = (self.attacks_from, self.occupied, self.sliders, self.colors, self.kings, self.attacked_cache)
+        self.attacks_from = list(self.attacks_from)
+        self.colors = dict(self.colors)
+        self.kings = dict(self.kings)
+        self.attacked_cache = {True: None, False: None}
+
+        # the chance to capture the last pawn to move two tiles with en passant has passed
+        if self.ep_square is not None:
+            ep = self.ep_square
+            pawn = self.board[ep.r, ep.c]
+            self.replace(undo, ep.r, ep.c, create_piece(pawn.code, ep=False, can_ep=pawn.can_ep_cap))
+            self.hash ^= ep_keys[ep.c]
+            self.ep_square = None
+
+        # an en passant capture takes the pawn beside the moving pawn rather than on the target
+        if move.is_ep_cap:
+            self.replace(undo, begin.r, target.c, None)
+
+        moved = piece
+        if move.promotion is not None:
+            moved = create_piece(move.promotion)
+        elif isinstance(piece, Pawn):
+            # a pawn which moves two tiles is capturable with en passant,
+            # and if a pawn captured, it can no longer capture with en passant
+            moved = create_piece(piece.code, ep=abs(begin.r - target.r) == 2,
+                                 can_ep=piece.can_ep_cap and begin.c == target.c)
+        elif isinstance(piece, Rook):
+            # a rook that moves can no longer castle
+            moved = create_piece(piece.code, can_castle=False)
+        elif isinstance(piece, King):
+            # a king that moves can no longer castle with either rook
+            for c in (0, 7):
+                rook = self.board[begin.r, c]
+                if isinstance(rook, Rook) and rook.isLight == piece.isLight and rook.can_castle:
+                    self.replace(undo, begin.r, c, create_piece(rook.code, can_castle=False))
+            # when castling, the rook jumps over the king
+            if move.is_castle:
+                rook_begin, rook_target = (7, 5) if target.c == 6 else (0, 3)
+                self.replace(undo, begin.r, rook_target, self.board[begin.r, rook_begin])
+                self.replace(undo, begin.r, rook_begin, None)
+
+        # move the piece, replacing anything it captures
+        self.replace(undo, begin.r, begin.c, None)
+        self.replace(undo, target.r, target.c, moved)
+
+        if isinstance(moved, Pawn) and moved.en_passant:
+            self.ep_square = target
+            self.hash ^= ep_keys[target.c]
+
+        # change the active player color
+        self.isLightTurn = not self.isLightTurn
+        self.history.append(undo)
+
+    def unmake_move(self):
+        """Take back the last move made with make_move, restoring the board to the state before it"""
+        undo = self.history.pop()
+
+        # put back every tile in the reverse order it was changed
+        tiles = self.board.tiles
+        for r, c, piece in reversed(undo.changes):
+            tiles[r * 8 + c] = piece
+        self.attacks_from, self.occupied, self.sliders, self.colors, self.kings, self.attacked_cache = undo.attacks
+
+        self.ep_square = undo.en_passant
+        self.hash = undo.hash
+        self.isLightTurn = not self.isLightTurn
+
     def read_board(self, board):
         """Read a board encoded as a string"""
-        # create an empty board of type piece
-        pieces = np.zeros((8, 8), dtype=Piece)
+        # create an empty grid of pieces
+        pieces = Grid()
 
         pieces_idx = 0
         board_idx = 0
@@ -44,6 +295,49 @@ class Board:
     
         return pieces
 
+    @classmethod
+    def from_bitboard(cls, bitboards):
+        """Construct a board from a bitboard representation"""
+        board = cls('empty')
+
+        for sq in range(64):
+            code = bitboards.piece_at(sq)
+            if code is None:
+                continue
+            bit = 1 << sq
+            # only rooks and pawns carry state
+            if code in 'rR':
+                piece = create_piece(code, can_castle=bool(bitboards.can_castle & bit))
+            elif code in 'pP':
+                piece = create_piece(code, ep=bool(bitboards.en_passant & bit), can_ep=bool(bitboards.can_ep_cap & bit))
+            else:
+                piece = create_piece(code)
+            board.board[sq // 8, sq % 8] = piece
+
+        board.ep_square = board.find_en_passant()
+        board.hash = hash_board(board)
+        board.reset_attacks()
+        return board
+
+    def to_bitboard(self):
+        """Convert the board state into a bitboard representation"""
+        bitboards = BitBoard()
+
+        for sq, piece in enumerate(self.board.tiles):
+            if piece is None:
+                continue
+            bitboards.place(piece.code, sq)
+            # carry over the state of rooks and pawns
+            if isinstance(piece, Rook) and piece.can_castle:
+                bitboards.can_castle |= 1 << sq
+            elif isinstance(piece, Pawn):
+                if piece.en_passant:
+                    bitboards.en_passant |= 1 << sq
+                if piece.can_ep_cap:
+                    bitboards.can_ep_cap |= 1 << sq
+
+        return bitboards
+
     def __str__(self):
         """Encode the board state as a string"""
         out = ''
@@ -0,0 +1,128 @@
+import random
+import struct
+import sys
+from legal import generate_legal_moves
+from mappedfile import MappedFile
+
+
+# the file starts with a magic string, a format version and the number of records
+magic: bytes = b'PYCHBOOK'
+version: int = 1
+header_format = struct.Struct('<8sII')
+
+# after the header come fixed width records sorted by hash, each holding the hash of a position, a move packed
+# the way Move.pack does and the weight of the move. A position with several book moves has a record for each
+record_format = struct.Struct('<QII')
+
+# the number of plies from the start of each game that are added to a book by default
+default_book_ply: int = 20
+
+
+def result_weight(result, isLight):
+    """Weighs a move by the result of the game it was played in for the player who played it, two for a win,
+    one for a draw or an unfinished game and nothing for a loss, so that moves which lose are never chosen"""
+    if result == '1/2-1/2' or result == '*':
+        return 1
+    return 2 if (result == '1-0') == isLight else 0
+
+
+class BookBuilder:
+    """A class for collecting the weight of every move played in every position and writing them out as a book"""
+
+    def __init__(self):
+        # the weight of each packed move, for each hash
+        self.records = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, board, move, weight=1):
+        moves = self.records.setdefault(board.hash, {})
+        moves[move.pack()] = moves.get(move.pack(), 0) + weight
+
+    def write(self, path):
+        """Writes every move with a weight to a file, sorted by hash so that it can be searched without being loaded"""
+        records = sorted((key, packed, weight) for key, moves in self.records.items()
+                         for packed, weight in moves.items() if weight > 0)
+        with open(path, 'wb') as f:
+            f.write(header_format.pack(magic, version, len(records)))
+            for record in records:
+                f.write(record_format.pack(*record))
+        return len(records)
+
+
+class OpeningBook(MappedFile):
+    """A class for reading an opening book through a read-only memory map. The records of a position are found by
+    binary searching the hashes of the sorted records in place"""
+
+    magic = magic
+    version = version
+    header_format = header_format
+    kind = 'an opening book'
+
+    def file_size(self):
+        return header_format.size + record_format.size * self.count
+
+    def map_keys(self):
+        # every record is two 64 bit words, the hash followed by the move and weight, so every other word of the
+        # records is a hash and the hashes can be binary searched without copying them
+        self.records_offset = header_format.size
+        records = memoryview(self.map)[self.records_offset:self.records_offset + record_format.size * self.count]
+        return records.cast('Q')[::2]
+
+    def lookup_hash(self, key):
+        """Gets the packed move and weight of every record for a hash"""
+        entries = []
+        i = self.find(key)
+        while 0 <= i < self.count and self.keys[i] == key:
+            _, packed, weight = record_format.unpack_from(self.map, self.records_offset + i * record_format.size)
+            entries.append((packed, weight))
+            i += 1
+        return entries
+
+    def lookup(self, board):
+        """Gets every book move for the player to move on a board with its weight, heaviest first.
+        Only legal moves are returned, so that a hash collision can't suggest a move that can't be played"""
+        entries = self.lookup_hash(board.hash)
+        if not entries:
+            return []
+        legal = {move.pack(): move for move in generate_legal_moves(board, board.isLightTurn)}
+        moves = [(legal[packed], weight) for packed, weight in entries if packed in legal]
+        return sorted(moves, key=lambda entry: -entry[1])
+
+    def choose(self, board, rng=random):
+        """Picks a book move for a board at random in proportion to the weights, or None if it is out of book"""
+        moves = self.lookup(board)
+        if not moves:
+            return None
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def build_from_pgn(pgn_path, book_path, max_ply=default_book_ply):
+    """Builds an opening book from the moves played in the first max_ply plies of every game in a PGN file,
+    weighted by the results of the games. Returns the number of records written"""
+    # the PGN reader is only needed to build a book, so engines reading one don't pay for importing it
+    from pgn import read_positions
+    builder = BookBuilder()
+    for game, board, move in read_positions(pgn_path):
+        if len(board.history) < max_ply:
+            builder.add(board, move, result_weight(game.result, board.isLightTurn))
+    return builder.write(book_path)
+
+
+def main(argv=None):
+    # the engine imports this module too, so the command line parser is only loaded when it is run as a script
+    import argparse
+    parser = argparse.ArgumentParser(description='Build an opening book from the games in a PGN file')
+    parser.add_argument('pgn', help='the PGN file to read, optionally gzipped')
+    parser.add_argument('book', help='the book file to write')
+    parser.add_argument('--max-ply', type=int, default=default_book_ply,
+                        help='the number of plies from the start of each game to add')
+    args = parser.parse_args(argv)
+
+    print(f'wrote {build_from_pgn(args.pgn, args.book, args.max_ply)} moves to {args.book}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
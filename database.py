@@ -0,0 +1,130 @@
+import struct
+from dataclasses import dataclass
+from fen import pack_board, unpack_board, packed_size
+from mappedfile import MappedFile
+from pgn import read_positions
+
+
+# the file starts with a magic string, a format version and the number of records
+magic: bytes = b'PYCHESDB'
+version: int = 1
+header_format = struct.Struct('<8sII')
+
+# after the header comes the sorted index of hashes, then one fixed width record per hash in the same order.
+# a record holds the packed position, the number of games it appeared in, the results of those games,
+# and a cached evaluation with the depth it was searched to, or a depth of -1 if there is none
+key_format = struct.Struct('<Q')
+record_format = struct.Struct(f'<{packed_size}sIIIIih')
+
+
+@dataclass
+class PositionStats:
+    """A class for representing everything stored about a single position"""
+    count: int = 0              # the number of times the position was reached
+    light_wins: int = 0
+    draws: int = 0
+    dark_wins: int = 0
+    evaluation: int = 0         # a cached evaluation in centipawns from the light player's point of view
+    depth: int = -1             # the depth the evaluation was searched to, or -1 if there is none
+
+    def add_result(self, result):
+        """Counts the result of a game, given as it is written in a PGN file"""
+        self.count += 1
+        if result == '1-0':
+            self.light_wins += 1
+        elif result == '0-1':
+            self.dark_wins += 1
+        elif result == '1/2-1/2':
+            self.draws += 1
+
+
+class DatabaseBuilder:
+    """A class for collecting positions in memory and writing them out as a position database"""
+
+    def __init__(self):
+        # the packed position and stats for each hash
+        self.records = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def stats(self, board):
+        """Gets the stats for a position, adding the position if it hasn't been seen"""
+        record = self.records.get(board.hash)
+        if record is None:
+            record = self.records[board.hash] = (pack_board(board), PositionStats())
+        return record[1]
+
+    def add_game_position(self, board, result):
+        self.stats(board).add_result(result)
+
+    def add_evaluation(self, board, evaluation, depth):
+        """Caches an evaluation for a position, keeping whichever evaluation was searched deepest"""
+        stats = self.stats(board)
+        if depth >= stats.depth:
+            stats.evaluation, stats.depth = evaluation, depth
+
+    def write(self, path):
+        """Writes every position to a file, sorted by hash so that it can be searched without being loaded"""
+        keys = sorted(self.records)
+        with open(path, 'wb') as f:
+            f.write(header_format.pack(magic, version, len(keys)))
+            for key in keys:
+                f.write(key_format.pack(key))
+            for key in keys:
+                packed, stats = self.records[key]
+                f.write(record_format.pack(packed, stats.count, stats.light_wins, stats.draws, stats.dark_wins,
+                                           stats.evaluation, stats.depth))
+
+
+class PositionDatabase(MappedFile):
+    """A class for reading a position database through a read-only memory map. Positions are found by binary
+    searching the sorted index of hashes that comes before the records"""
+
+    magic = magic
+    version = version
+    header_format = header_format
+    kind = 'a position database'
+
+    def file_size(self):
+        return header_format.size + (key_format.size + record_format.size) * self.count
+
+    def map_keys(self):
+        # a view of the index as 64 bit integers, which can be binary searched without copying it
+        self.index_offset = header_format.size
+        self.records_offset = self.index_offset + key_format.size * self.count
+        return memoryview(self.map)[self.index_offset:self.records_offset].cast('Q')
+
+    def read_record(self, i):
+        """Reads the packed position and stats stored in a record"""
+        packed, *fields = record_format.unpack_from(self.map, self.records_offset + i * record_format.size)
+        return packed, PositionStats(*fields)
+
+    def lookup_hash(self, key):
+        """Gets the stats stored for a hash, or None if it isn't in the database"""
+        i = self.find(key)
+        return None if i < 0 else self.read_record(i)[1]
+
+    def lookup(self, board):
+        """Gets the stats stored for a board, or None if it isn't in the database.
+        The stored position is checked against the board so that a hash collision can't return the wrong stats"""
+        i = self.find(board.hash)
+        if i < 0:
+            return None
+        packed, stats = self.read_record(i)
+        return stats if packed == pack_board(board) else None
+
+    def board(self, i):
+        """Reads back the board stored in a record"""
+        return unpack_board(self.read_record(i)[0])
+
+
+def build_from_pgn(pgn_path, db_path, max_ply=None):
+    """Builds a position database with the results of every position reached in the games of a PGN file,
+    optionally only counting the first max_ply plies of each game"""
+    builder = DatabaseBuilder()
+    for game, board, move in read_positions(pgn_path):
+        if max_ply is None or len(board.history) < max_ply:
+            builder.add_game_position(board, game.result)
+    builder.write(db_path)
+    return len(builder)
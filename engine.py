@@ -0,0 +1,108 @@
+from copy import deepcopy
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from legal import generate_legal_moves
+from search import Search
+
+
+class EngineWorker(QObject):
+    """Does the work of the engine on a background thread. Every request carries the generation it was made in,
+    and requests from an older generation than the engine's current one are skipped without being worked on"""
+
+    moves_ready = pyqtSignal(int, object)       # the generation and the list of legal moves
+    hint_ready = pyqtSignal(int, object)        # the generation and the search result for the player to move
+    reply_ready = pyqtSignal(int, object)       # the generation and the search result for the engine's move
+
+    def __init__(self, engine, book=None):
+        super(EngineWorker, self).__init__()
+        self.engine = engine
+        self.search = Search(book=book)
+
+    @pyqtSlot(int, object)
+    def generate_moves(self, generation, board):
+        if generation == self.engine.generation:
+            self.moves_ready.emit(generation, generate_legal_moves(board, board.isLightTurn))
+
+    def is_stale(self, generation):
+        return lambda: generation != self.engine.generation
+
+    @pyqtSlot(int, object, int, float)
+    def find_hint(self, generation, board, depth, time_limit):
+        # the search checks the generation as it goes, so a cancel that arrives just before it starts still stops it
+        if generation == self.engine.generation:
+            result = self.search.search(board, depth, time_limit, cancelled=self.is_stale(generation))
+            self.hint_ready.emit(generation, result)
+
+    @pyqtSlot(int, object, int, float)
+    def find_reply(self, generation, board, depth, time_limit):
+        if generation == self.engine.generation:
+            result = self.search.search(board, depth, time_limit, cancelled=self.is_stale(generation))
+            self.reply_ready.emit(generation, result)
+
+
+class Engine(QObject):
+    """Runs move generation and searches on a background thread so that the UI thread never waits on them.
+    Requests are queued to the worker thread through signals, and results come back through the signals below on
+    the UI thread. Cancelling stops any running search and drops every result that hasn't been delivered yet,
+    so a result is never delivered for a position the board has already moved on from"""
+
+    moves_ready = pyqtSignal(object)
+    hint_ready = pyqtSignal(object)
+    reply_ready = pyqtSignal(object)
+
+    # signals that queue requests to the worker thread
+    request_moves = pyqtSignal(int, object)
+    request_hint = pyqtSignal(int, object, int, float)
+    request_reply = pyqtSignal(int, object, int, float)
+
+    def __init__(self, depth=4, time_limit=2.0, book=None):
+        super(Engine, self).__init__()
+        self.depth = depth
+        self.time_limit = time_limit
+        # incremented every time the board changes, which makes every outstanding request stale
+        self.generation = 0
+
+        self.thread = QThread()
+        # book moves are answered by the search straight away, so they arrive without any thinking time
+        self.worker = EngineWorker(self, book)
+        self.worker.moveToThread(self.thread)
+
+        self.request_moves.connect(self.worker.generate_moves)
+        self.request_hint.connect(self.worker.find_hint)
+        self.request_reply.connect(self.worker.find_reply)
+        self.worker.moves_ready.connect(self.deliver_moves)
+        self.worker.hint_ready.connect(self.deliver_hint)
+        self.worker.reply_ready.connect(self.deliver_reply)
+
+        self.thread.start()
+
+    def cancel(self):
+        """Makes every outstanding request stale. A running search checks its generation as it goes, so it stops too"""
+        self.generation += 1
+
+    def generate_moves(self, board):
+        # the worker gets its own copy, since the board keeps changing on the UI thread
+        self.request_moves.emit(self.generation, deepcopy(board))
+
+    def find_hint(self, board):
+        self.request_hint.emit(self.generation, deepcopy(board), self.depth, self.time_limit)
+
+    def find_reply(self, board):
+        self.request_reply.emit(self.generation, deepcopy(board), self.depth, self.time_limit)
+
+    def deliver_moves(self, generation, moves):
+        if generation == self.generation:
+            self.moves_ready.emit(moves)
+
+    def deliver_hint(self, generation, result):
+        if generation == self.generation:
+            self.hint_ready.emit(result)
+
+    def deliver_reply(self, generation, result):
+        if generation == self.generation:
+            self.reply_ready.emit(result)
+
+    def shutdown(self):
+        """Cancels any work and waits for the worker thread to finish"""
+        self.cancel()
+        self.thread.quit()
+        self.thread.wait()
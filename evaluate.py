@@ -0,0 +1,133 @@
+from bitboard import piece_codes
+
+
+# material values in centipawns for each type of piece
+piece_values = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+
+# piece-square tables from the light player's point of view, with row 0 at the top of the board
+piece_square_tables = {
+    'P': [0, 0, 0, 0, 0, 0, 0, 0,
+          50, 50, 50, 50, 50, 50, 50, 50,
+          10, 10, 20, 30, 30, 20, 10, 10,
+          5, 5, 10, 25, 25, 10, 5, 5,
+          0, 0, 0, 20, 20, 0, 0, 0,
+          5, -5, -10, 0, 0, -10, -5, 5,
+          5, 10, 10, -20, -20, 10, 10, 5,
+          0, 0, 0, 0, 0, 0, 0, 0],
+    'N': [-50, -40, -30, -30, -30, -30, -40, -50,
+          -40, -20, 0, 0, 0, 0, -20, -40,
+          -30, 0, 10, 15, 15, 10, 0, -30,
+          -30, 5, 15, 20, 20, 15, 5, -30,
+          -30, 0, 15, 20, 20, 15, 0, -30,
+          -30, 5, 10, 15, 15, 10, 5, -30,
+          -40, -20, 0, 5, 5, 0, -20, -40,
+          -50, -40, -30, -30, -30, -30, -40, -50],
+    'B': [-20, -10, -10, -10, -10, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 10, 10, 5, 0, -10,
+          -10, 5, 5, 10, 10, 5, 5, -10,
+          -10, 0, 10, 10, 10, 10, 0, -10,
+          -10, 10, 10, 10, 10, 10, 10, -10,
+          -10, 5, 0, 0, 0, 0, 5, -10,
+          -20, -10, -10, -10, -10, -10, -10, -20],
+    'R': [0, 0, 0, 0, 0, 0, 0, 0,
+          5, 10, 10, 10, 10, 10, 10, 5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          0, 0, 0, 5, 5, 0, 0, 0],
+    'Q': [-20, -10, -10, -5, -5, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 5, 5, 5, 0, -10,
+          -5, 0, 5, 5, 5, 5, 0, -5,
+          0, 0, 5, 5, 5, 5, 0, -5,
+          -10, 5, 5, 5, 5, 5, 0, -10,
+          -10, 0, 5, 0, 0, 0, 0, -10,
+          -20, -10, -10, -5, -5, -10, -10, -20],
+    'K': [-30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -20, -30, -30, -40, -40, -30, -30, -20,
+          -10, -20, -20, -20, -20, -20, -20, -10,
+          20, 20, 0, 0, 0, 0, 20, 20,
+          20, 30, 10, 0, 0, 10, 30, 20],
+}
+
+
+def build_square_scores():
+    """Combines the material value and piece-square table of every piece code into a single signed score per square.
+    Dark pieces use the light tables mirrored top to bottom and count against the light player"""
+    scores = {}
+    for code in piece_codes:
+        table = piece_square_tables[code.upper()]
+        value = piece_values[code.upper()]
+        if code.isupper():
+            scores[code] = [value + table[sq] for sq in range(64)]
+        else:
+            scores[code] = [-(value + table[(7 - sq // 8) * 8 + sq % 8]) for sq in range(64)]
+    return scores
+
+
+# the signed score of every piece code on every square
+square_scores = build_square_scores()
+
+# compact integer codes for the pieces in an encoded board. light pieces are positive, dark pieces are negative
+# and empty tiles are zero
+piece_numbers = {code: (i % 6 + 1) * (1 if code.isupper() else -1) for i, code in enumerate(piece_codes)}
+piece_numbers[None] = 0
+
+
+def build_number_scores():
+    """Arranges the square scores in a (13, 64) array indexed by piece number + 6 and square, for vectorized lookup"""
+    import numpy as np
+    scores = np.zeros((13, 64), dtype=np.int32)
+    for code in piece_codes:
+        scores[piece_numbers[code] + 6] = square_scores[code]
+    return scores
+
+
+# the score of every piece number on every square. numpy is only loaded by the batch functions, so this is built
+# the first time one of them is used, and evaluate works without numpy installed
+number_scores = None
+
+
+def evaluate(board):
+    """Scores a board in centipawns from the light player's point of view using material and piece-square tables"""
+    score = 0
+    for sq, piece in enumerate(board.board.tiles):
+        if piece is not None:
+            score += square_scores[piece.code][sq]
+    return score
+
+
+def encode_board(board):
+    """Encodes a board as an 8x8 int8 array of piece numbers"""
+    import numpy as np
+    return np.array([[piece_numbers[None if piece is None else piece.code] for piece in row] for row in board.board],
+                    dtype=np.int8)
+
+
+def encode_boards(boards):
+    """Encodes a sequence of boards as an (N, 8, 8) int8 array of piece numbers"""
+    import numpy as np
+    encoded = np.zeros((len(boards), 8, 8), dtype=np.int8)
+    for i, board in enumerate(boards):
+        encoded[i] = encode_board(board)
+    return encoded
+
+
+def evaluate_batch(encoded):
+    """Scores a batch of encoded boards at once with the same material and piece-square tables as evaluate.
+    Takes an (N, 8, 8) array of piece numbers and returns an (N,) int32 array of scores from the light player's
+    point of view. A single (8, 8) board is scored as a batch of one"""
+    import numpy as np
+    global number_scores
+    if number_scores is None:
+        number_scores = build_number_scores()
+
+    encoded = np.asarray(encoded, dtype=np.int8).reshape(-1, 64)
+    # look up the score of the piece on every square of every board, then total each board
+    return number_scores[encoded.astype(np.intp) + 6, np.arange(64)].sum(axis=1, dtype=np.int32)
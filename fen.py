@@ -0,0 +1,195 @@
+from board import Board
+from evaluate import piece_numbers
+
+
+files: str = 'abcdefgh'
+start_fen: str = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# the corner each castling right in a FEN string refers to
+castle_corners = {'K': (7, 7), 'Q': (7, 0), 'k': (0, 7), 'q': (0, 0)}
+
+# the nibble used for each piece in a packed position. rooks that can still castle and the pawn that can be captured
+# with en passant get nibbles of their own, and the color of that pawn is the opposite of the player to move
+nibbles = {None: 0, 'P': 1, 'N': 2, 'B': 3, 'R': 4, 'Q': 5, 'K': 6, 'p': 7, 'n': 8, 'b': 9, 'r': 10, 'q': 11, 'k': 12}
+castle_nibbles = {'R': 13, 'r': 14}
+ep_nibble: int = 15
+
+# the size in bytes of a packed position: a nibble for each of the 64 squares followed by a byte of flags
+packed_size: int = 33
+dark_to_move_flag: int = 1
+
+
+def square_name(r, c):
+    """Gets the algebraic name of a tile, such as e4"""
+    return f'{files[c]}{8 - r}'
+
+
+def move_name(move):
+    """Gets the long algebraic name of a move, such as e2e4, or e7e8q for a promotion"""
+    name = square_name(move.begin.r, move.begin.c) + square_name(move.target.r, move.target.c)
+    return name + move.promotion.lower() if move.promotion is not None else name
+
+
+def read_fen(fen):
+    """Reads a board from a FEN string. The move counters are accepted but not stored, since boards don't track them"""
+    fields = fen.split()
+    placement = fields[0]
+    isLightTurn = len(fields) < 2 or fields[1] == 'w'
+    castling = fields[2] if len(fields) > 2 else '-'
+    ep = fields[3] if len(fields) > 3 else '-'
+
+    # rooks in the corners named by the castling rights can still castle
+    castle_squares = {castle_corners[right] for right in castling if right in castle_corners}
+    # the pawn that can be captured is one tile past the en passant target, towards the player that moved it
+    ep_square = None
+    if ep != '-':
+        ep_r, ep_c = 8 - int(ep[1]), files.index(ep[0])
+        ep_square = (ep_r + 1 if isLightTurn else ep_r - 1, ep_c)
+
+    # build the string encoding for the board
+    out = ''
+    for r, row in enumerate(placement.split('/')):
+        c = 0
+        for char in row:
+            if char.isdigit():
+                out += 'e' * int(char)
+                c += int(char)
+                continue
+            out += char
+            if char in 'rR':
+                out += '1' if (r, c) in castle_squares else '0'
+            elif char in 'pP':
+                out += ('1' if (r, c) == ep_square else '0') + '1'
+            c += 1
+
+    return Board(out, isLightTurn)
+
+
+def write_fen(board, halfmove=0, fullmove=1):
+    """Writes a board as a FEN string. Boards don't track the move counters, so they can be given"""
+    rows = []
+    for r in range(8):
+        row, empty = '', 0
+        for c in range(8):
+            piece = board.board[r, c]
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += piece.code
+        if empty:
+            row += str(empty)
+        rows.append(row)
+
+    castling = ''
+    for right, (r, c) in castle_corners.items():
+        piece = board.board[r, c]
+        if piece is not None and piece.code == ('R' if right.isupper() else 'r') and piece.can_castle:
+            castling += right
+
+    ep = '-'
+    if board.ep_square is not None:
+        # the target is the tile the pawn skipped over
+        r, c = board.ep_square.r, board.ep_square.c
+        ep = square_name(r + 1 if board.board[r, c].isLight else r - 1, c)
+
+    return f'{"/".join(rows)} {"w" if board.isLightTurn else "b"} {castling or "-"} {ep} {halfmove} {fullmove}'
+
+
+def pack_board(board):
+    """Packs a board into 33 bytes: a nibble for each square, high nibble first, then a byte of flags.
+    Pawns are assumed to be able to capture with en passant, so can_ep_cap is not stored"""
+    squares = []
+    for r in range(8):
+        for c in range(8):
+            piece = board.board[r, c]
+            if piece is None:
+                squares.append(0)
+            elif piece.code in 'rR' and piece.can_castle:
+                squares.append(castle_nibbles[piece.code])
+            elif piece.code in 'pP' and piece.en_passant:
+                squares.append(ep_nibble)
+            else:
+                squares.append(nibbles[piece.code])
+
+    flags = 0 if board.isLightTurn else dark_to_move_flag
+    return bytes((squares[i] << 4) | squares[i + 1] for i in range(0, 64, 2)) + bytes([flags])
+
+
+def unpack_board(data):
+    """Reads a board back from the bytes created by pack_board"""
+    isLightTurn = not data[32] & dark_to_move_flag
+    # the pawn that can be captured with en passant belongs to the player that just moved
+    ep_pawn = 'p' if isLightTurn else 'P'
+    codes = {nibble: code for code, nibble in nibbles.items()}
+
+    out = ''
+    for byte in data[:32]:
+        for nibble in (byte >> 4, byte & 15):
+            if nibble == 0:
+                out += 'e'
+            elif nibble == ep_nibble:
+                out += ep_pawn + '11'
+            elif nibble in (13, 14):
+                out += ('R' if nibble == 13 else 'r') + '1'
+            else:
+                code = codes[nibble]
+                out += code + ('0' if code in 'rR' else '01' if code in 'pP' else '')
+
+    return Board(out, isLightTurn)
+
+
+def pack_boards(boards):
+    """Packs many boards into an (N, 33) uint8 array, one packed position per row"""
+    import numpy as np
+    data = bytearray()
+    for board in boards:
+        data += pack_board(board)
+    return np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, packed_size)
+
+
+def unpack_boards(packed):
+    """Reads every board back from an (N, 33) uint8 array or the concatenated bytes of packed positions"""
+    import numpy as np
+    packed = np.frombuffer(packed, dtype=np.uint8) if isinstance(packed, (bytes, bytearray)) else packed
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, packed_size)
+    return [unpack_board(row.tobytes()) for row in packed]
+
+
+def build_nibble_numbers():
+    """Maps every nibble to the piece number used by the vectorized evaluation. The en passant nibble is
+    left at zero here since its color depends on the player to move, and is filled in by packed_to_numbers"""
+    import numpy as np
+    numbers = np.zeros(16, dtype=np.int8)
+    for code, nibble in nibbles.items():
+        numbers[nibble] = piece_numbers[code]
+    for code, nibble in castle_nibbles.items():
+        numbers[nibble] = piece_numbers[code]
+    return numbers
+
+
+# the piece number for each nibble, as an array that packed_to_numbers builds on its first call
+nibble_numbers = None
+
+
+def packed_to_numbers(packed):
+    """Converts an (N, 33) array of packed positions straight into the (N, 8, 8) int8 piece numbers
+    used by evaluate_batch, without creating a board for any of them"""
+    import numpy as np
+    global nibble_numbers
+    if nibble_numbers is None:
+        nibble_numbers = build_nibble_numbers()
+
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, packed_size)
+    squares = np.empty((len(packed), 64), dtype=np.uint8)
+    squares[:, 0::2] = packed[:, :32] >> 4
+    squares[:, 1::2] = packed[:, :32] & 15
+    numbers = nibble_numbers[squares]
+
+    # the en passant pawn is dark when light is to move and light when dark is to move
+    ep_sign = np.where(packed[:, 32] & dark_to_move_flag, 1, -1).astype(np.int8)
+    numbers = np.where(squares == ep_nibble, ep_sign[:, None] * piece_numbers['P'], numbers)
+
+    return numbers.reshape(-1, 8, 8).astype(np.int8)
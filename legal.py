@@ -0,0 +1,326 @@
+from move import Move, packed_promotions
+from attacks import ray_masks, queen_directions, rook_directions, increasing_directions, between_masks
+from bitboard import iterate_bits, knight_attacks, king_attacks, rook_attacks, bishop_attacks, \
+                     queen_attacks, pawn_attacks
+
+
+# the pieces a pawn can be promoted to
+promotion_codes: str = 'QRBN'
+
+# the bits of a packed move marking a promotion to each piece, an en passant capture and a castle
+promotion_flags = {True: [(packed_promotions.index(code) + 1) << 12 for code in promotion_codes],
+                   False: [(packed_promotions.index(code.lower()) + 1) << 12 for code in promotion_codes]}
+ep_flag: int = 1 << 16
+castle_flag: int = 1 << 17
+
+# the row each king starts on, and so the row castling happens on
+home_rows = {True: 7, False: 0}
+
+
+def generate_legal_moves(board, isLight):
+    """Generates every legal move for one player on a board.
+    Unlike the piece move generators, moves which would leave the player's own king in check are excluded
+    and castling and promotion moves are included"""
+    return generate_legal_bitboard_moves(board.to_bitboard(), isLight, board.attacked(not isLight))
+
+
+def is_in_check(board, isLight):
+    """Checks if one player's king is in check on a board, using the attack maps the board keeps up to date"""
+    return board.in_check(isLight)
+
+
+def is_bitboard_in_check(bitboards, isLight):
+    """Checks if one player's king is in check on a bitboard"""
+    king = bitboards.pieces['K' if isLight else 'k']
+    return king != 0 and bool(attackers(bitboards, king.bit_length() - 1, isLight, bitboards.occupied))
+
+
+def nearest(mask, direction):
+    """Gets the set square in a mask that is nearest the start of a ray in a given direction"""
+    if direction in increasing_directions:
+        return (mask & -mask).bit_length() - 1
+    return mask.bit_length() - 1
+
+
+def enemy_codes(isLight):
+    """Gets the codes of the pawn, knight, bishop, rook, queen and king of the opposing player"""
+    return 'pnbrqk' if isLight else 'PNBRQK'
+
+
+def attackers(bitboards, sq, isLight, occupied):
+    """Calculates a mask of every enemy piece attacking a square, given the occupancy of the board"""
+    pawn, knight, bishop, rook, queen, king = (bitboards.pieces[code] for code in enemy_codes(isLight))
+    return (pawn_attacks(sq, isLight) & pawn) | (knight_attacks(sq) & knight) | (king_attacks(sq) & king) | \
+           (rook_attacks(sq, occupied) & (rook | queen)) | (bishop_attacks(sq, occupied) & (bishop | queen))
+
+
+def attacked_squares(bitboards, isLight, occupied):
+    """Calculates a mask of every tile attacked by the opposing player, given the occupancy of the board"""
+    pawn, knight, bishop, rook, queen, king = (bitboards.pieces[code] for code in enemy_codes(isLight))
+    attacked = 0
+    for sq in iterate_bits(pawn):
+        attacked |= pawn_attacks(sq, not isLight)
+    for sq in iterate_bits(knight):
+        attacked |= knight_attacks(sq)
+    for sq in iterate_bits(bishop):
+        attacked |= bishop_attacks(sq, occupied)
+    for sq in iterate_bits(rook):
+        attacked |= rook_attacks(sq, occupied)
+    for sq in iterate_bits(queen):
+        attacked |= queen_attacks(sq, occupied)
+    for sq in iterate_bits(king):
+        attacked |= king_attacks(sq)
+    return attacked
+
+
+def pin_masks(bitboards, king, isLight):
+    """Finds every allied piece pinned to the king. Returns a dictionary mapping the square of each pinned
+    piece to a mask of the tiles it may still move to, the tiles between the king and the pinning piece"""
+    _, _, bishop, rook, queen, _ = (bitboards.pieces[code] for code in enemy_codes(isLight))
+    allies = bitboards.allies(isLight)
+    pins = {}
+
+    for direction in queen_directions:
+        ray = ray_masks[direction][king]
+        blockers = ray & bitboards.occupied
+        if not blockers:
+            continue
+        # the first piece along the ray must be an ally for it to be pinned
+        first = nearest(blockers, direction)
+        if not allies & (1 << first):
+            continue
+        behind = blockers & ray_masks[direction][first]
+        if not behind:
+            continue
+        # the second piece must be an enemy slider that moves along the ray
+        second = nearest(behind, direction)
+        sliders = (rook | queen) if direction in rook_directions else (bishop | queen)
+        if sliders & (1 << second):
+            pins[first] = ray ^ ray_masks[direction][second]
+
+    return pins
+
+
+def generate_legal_bitboard_moves(bitboards, isLight, attacked=None):
+    """Generates every legal move for one player on a bitboard.
+    The tiles attacked by the opposing player can be given if they are already known"""
+    return [Move.unpack(packed) for packed in generate_packed_moves(bitboards, isLight, attacked)]
+
+
+def generate_packed_moves(bitboards, isLight, attacked=None):
+    """Generates every legal move for one player on a bitboard, each packed into an integer the way Move.pack does.
+    Pins and checks are found up front so that each piece is restricted to the tiles it can legally reach without
+    making and unmaking any moves. No move objects are created, so batches of positions stay cheap"""
+    moves = []
+    allies = bitboards.allies(isLight)
+    occupied = bitboards.occupied
+    king_code = 'K' if isLight else 'k'
+
+    # a board without a king for the player has no notion of check, so every square is safe
+    king_mask = bitboards.pieces[king_code]
+    if not king_mask:
+        king = None
+        checkers = 0
+        attacked = 0
+    else:
+        king = king_mask.bit_length() - 1
+        checkers = attackers(bitboards, king, isLight, occupied)
+        # the king is removed so that it cannot step backwards along the ray of a slider checking it.
+        # when it isn't in check no slider's ray reaches it, so the attacks with the king in place can be used
+        if checkers or attacked is None:
+            attacked = attacked_squares(bitboards, isLight, occupied ^ king_mask)
+
+    if king is not None:
+        moves.extend(generate_king_moves(king, allies, attacked))
+
+    # in double check only the king may move
+    if checkers & (checkers - 1):
+        return moves
+
+    # in check, every other move must capture the checking piece or block it
+    if checkers:
+        checker = checkers.bit_length() - 1
+        evasions = checkers | between_masks[king][checker]
+    else:
+        evasions = ~0
+        if king is not None:
+            moves.extend(generate_castles(bitboards, king, isLight, attacked))
+
+    pins = pin_masks(bitboards, king, isLight) if king is not None else {}
+
+    for code in ('N', 'B', 'R', 'Q') if isLight else ('n', 'b', 'r', 'q'):
+        if bitboards.pieces[code]:
+            moves.extend(generate_piece_moves(bitboards, code, allies, evasions, pins))
+
+    moves.extend(generate_pawn_moves(bitboards, isLight, king, evasions, pins))
+
+    return moves
+
+
+def generate_king_moves(king, allies, attacked):
+    """Generates the packed moves of a king onto every tile that isn't attacked, besides castling"""
+    return [king | (sq << 6) for sq in iterate_bits(king_attacks(king) & ~allies & ~attacked)]
+
+
+def generate_piece_moves(bitboards, code, allies, evasions, pins):
+    """Generates the packed legal moves for every knight, bishop, rook or queen with the same code"""
+    moves = []
+    occupied = bitboards.occupied
+    for sq in iterate_bits(bitboards.pieces[code]):
+        if code in 'nN':
+            targets = knight_attacks(sq)
+        elif code in 'bB':
+            targets = bishop_attacks(sq, occupied)
+        elif code in 'rR':
+            targets = rook_attacks(sq, occupied)
+        else:
+            targets = queen_attacks(sq, occupied)
+        targets &= ~allies & evasions & pins.get(sq, ~0)
+        for target in iterate_bits(targets):
+            moves.append(sq | (target << 6))
+    return moves
+
+
+def generate_pawn_moves(bitboards, isLight, king, evasions, pins):
+    """Generates the packed legal moves for every pawn of one player, including promotions and en passant"""
+    moves = []
+    enemies = bitboards.enemies(isLight)
+    occupied = bitboards.occupied
+    step, start_row, last_row = (-8, 6, 0) if isLight else (8, 1, 7)
+    promotions = promotion_flags[isLight]
+
+    for sq in iterate_bits(bitboards.pieces['P' if isLight else 'p']):
+        allowed = evasions & pins.get(sq, ~0)
+
+        # pawns capture diagonally and advance onto empty tiles
+        targets = pawn_attacks(sq, isLight) & enemies
+        one = sq + step
+        if 0 <= one < 64 and not occupied & (1 << one):
+            targets |= 1 << one
+            if sq >> 3 == start_row and not occupied & (1 << (one + step)):
+                targets |= 1 << (one + step)
+
+        for target in iterate_bits(targets & allowed):
+            # a pawn reaching the last row must be promoted
+            if target >> 3 == last_row:
+                for flag in promotions:
+                    moves.append(sq | (target << 6) | flag)
+            else:
+                moves.append(sq | (target << 6))
+
+        moves.extend(generate_en_passant(bitboards, isLight, king, sq, evasions, pins))
+
+    return moves
+
+
+def generate_en_passant(bitboards, isLight, king, sq, evasions, pins):
+    """Generates any legal en passant capture for a single pawn, packed"""
+    moves = []
+    enemy_pawns = bitboards.pieces['p' if isLight else 'P']
+    step = -8 if isLight else 8
+    r, c = sq >> 3, sq & 7
+
+    for victim_c in (c - 1, c + 1):
+        if not 0 <= victim_c <= 7:
+            continue
+        victim = r * 8 + victim_c
+        # the enemy pawn must have just advanced two tiles
+        if not enemy_pawns & bitboards.en_passant & (1 << victim):
+            continue
+        target = victim + step
+        # the capture must resolve any check, either by landing on a blocking tile or by removing the checker
+        if not evasions & ((1 << target) | (1 << victim)):
+            continue
+        if not pins.get(sq, ~0) & (1 << target):
+            continue
+        # both pawns leave the row at once, which can expose the king along it, so test the final occupancy
+        if king is not None:
+            occupied = (bitboards.occupied ^ (1 << sq) ^ (1 << victim)) | (1 << target)
+            _, _, bishop, rook, queen, _ = (bitboards.pieces[code] for code in enemy_codes(isLight))
+            if rook_attacks(king, occupied) & (rook | queen) or bishop_attacks(king, occupied) & (bishop | queen):
+                continue
+        moves.append(sq | (target << 6) | ep_flag)
+
+    return moves
+
+
+def generate_castles(bitboards, king, isLight, attacked):
+    """Generates the packed castling moves for a king that is not in check. A rook which can still castle must be in
+    the corner, every tile between it and the king must be empty, and the king may not cross an attacked tile"""
+    moves = []
+    row = home_rows[isLight]
+    rooks = bitboards.pieces['R' if isLight else 'r'] & bitboards.can_castle
+
+    # the king must be on its starting tile
+    if king != row * 8 + 4:
+        return moves
+
+    # king side, the king moves two tiles towards the rook in the east corner
+    if rooks & (1 << (row * 8 + 7)):
+        empty = (1 << (row * 8 + 5)) | (1 << (row * 8 + 6))
+        if not bitboards.occupied & empty and not attacked & empty:
+            moves.append(king | ((king + 2) << 6) | castle_flag)
+    # queen side, the tile next to the rook must also be empty but may be attacked
+    if rooks & (1 << (row * 8)):
+        empty = (1 << (row * 8 + 1)) | (1 << (row * 8 + 2)) | (1 << (row * 8 + 3))
+        safe = (1 << (row * 8 + 2)) | (1 << (row * 8 + 3))
+        if not bitboards.occupied & empty and not attacked & safe:
+            moves.append(king | ((king - 2) << 6) | castle_flag)
+
+    return moves
+
+
+# the bits of the flags field of a batch of moves. The low four bits hold the promotion numbered as in a packed move
+batch_ep_flag: int = 1 << 4
+batch_castle_flag: int = 1 << 5
+batch_capture_flag: int = 1 << 6
+
+
+def build_move_dtype():
+    """Builds the structured dtype for a batch of moves, the index of the position each move belongs to,
+    its begin and target squares and its flags"""
+    import numpy as np
+    return np.dtype([('index', np.int32), ('begin', np.uint8), ('target', np.uint8), ('flags', np.uint8)])
+
+
+# the dtype of a batch of moves, created by the first batch generated rather than when this module is imported
+move_dtype = None
+
+
+def generate_legal_moves_batch(boards):
+    """Generates every legal move for the player to move in many positions at once, without creating an object
+    for any move. Takes a sequence of boards, or an (N, 33) array of packed positions from fen.pack_boards.
+    Returns a structured array of moves, position by position, and an (N + 1,) int64 array of offsets, so that
+    the moves of position i are moves[offsets[i]:offsets[i + 1]]"""
+    import numpy as np
+    global move_dtype
+    if move_dtype is None:
+        move_dtype = build_move_dtype()
+
+    if isinstance(boards, (bytes, bytearray, np.ndarray)):
+        from fen import unpack_boards
+        boards = unpack_boards(boards)
+
+    packed, counts, enemies = [], [], []
+    for board in boards:
+        isLight = board.isLightTurn
+        bitboards = board.to_bitboard()
+        moves = generate_packed_moves(bitboards, isLight, board.attacked(not isLight))
+        packed.extend(moves)
+        counts.append(len(moves))
+        enemies.append(bitboards.enemies(isLight))
+
+    packed = np.array(packed, dtype=np.int64)
+    counts = np.array(counts, dtype=np.int64)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    moves = np.empty(len(packed), dtype=move_dtype)
+    moves['index'] = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+    moves['begin'] = packed & 63
+    moves['target'] = (packed >> 6) & 63
+    # a move captures if its target holds an enemy piece, or if it is en passant
+    targets = np.array(enemies, dtype=np.uint64)[moves['index']] >> moves['target'].astype(np.uint64)
+    captures = (targets & np.uint64(1)).astype(np.uint8) | ((packed >> 16) & 1).astype(np.uint8)
+    moves['flags'] = ((packed >> 12) & 63).astype(np.uint8) | (captures * batch_capture_flag)
+    return moves, offsets
@@ -0,0 +1,86 @@
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+
+class MappedFile:
+    """A base class for reading a file of fixed width records through a read-only memory map, so nothing is loaded
+    or parsed up front and every process that opens the same file shares the pages cached by the operating system.
+    The file starts with a header holding a magic string, a format version and the number of records, which
+    subclasses describe with the class attributes below, and the records that follow must fill exactly the size
+    returned by file_size, if a subclass gives one. Subclasses whose records are sorted by a 64 bit hash return a view of the hashes from
+    map_keys, so that they can be binary searched in place"""
+
+    magic: bytes = b''
+    version: int = 1
+    header_format = struct.Struct('<8sII')
+    # what the file holds, for the error raised when a file isn't one
+    kind: str = 'a record file'
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = None
+        self.map = None
+        self.file = open(path, 'rb')
+        try:
+            self.read_header()
+            self.keys = self.map_keys()
+        except BaseException:
+            self.close()
+            raise
+
+    def read_header(self):
+        """Maps the file and checks its header and size, raising a ValueError for any file that isn't valid"""
+        # an empty file can't be mapped, and a short one would fail to unpack, so both are caught first
+        if os.fstat(self.file.fileno()).st_size < self.header_format.size:
+            raise ValueError(f'{self.path} is not {self.kind}, it is too short to hold a header')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # the header may hold more fields after the count, which are kept for subclasses to read
+        self.header = self.header_format.unpack_from(self.map, 0)
+        file_magic, file_version, self.count = self.header[:3]
+        if file_magic != self.magic or file_version != self.version or not self.check_header():
+            raise ValueError(f'{self.path} is not {self.kind}')
+        size = self.file_size()
+        if size is not None and len(self.map) != size:
+            raise ValueError(f'{self.path} is {len(self.map)} bytes but its header describes {size}, '
+                             f'so it is truncated or corrupt')
+
+    def check_header(self):
+        """Checks any fields of the header besides the magic string and version"""
+        return True
+
+    def file_size(self):
+        """The size in bytes of a valid file with the number of records given in its header, or None if it isn't
+        checked"""
+        return None
+
+    def map_keys(self):
+        """Gets a view of the sorted hashes of the records, or None if the records aren't found by hash"""
+        return None
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __reduce__(self):
+        # a memory map can't be pickled, so another process opens the file again and maps the same pages
+        return type(self), (self.path,)
+
+    def close(self):
+        if self.keys is not None:
+            self.keys.release()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def find(self, key):
+        """Finds the index of the first record for a hash, or -1 if there isn't one"""
+        i = bisect_left(self.keys, key)
+        return i if i < self.count and self.keys[i] == key else -1
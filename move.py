@@ -1,20 +1,71 @@
-from dataclasses import dataclass
-from position import Position
+from position import positions
+
+
+# the codes a pawn can be promoted to, in the order they are numbered when a move is packed
+packed_promotions: str = 'QRBNqrbn'
 
 
-@dataclass
 class Move:
     """A class for representing a single move as a pair of positions.
-    Tracks whether a move is an en passant capture for the rare case that matters"""
-    begin: Position
-    target: Position
-    is_ep_cap: bool = False
+    Tracks whether a move is an en passant capture or castle for the rare cases that matter,
+    and the code of the piece a pawn is promoted to.
+    The whole move is packed into a single integer. The low twelve bits hold the begin and target squares,
+    followed by four bits for the promotion and a bit each for en passant and castling"""
+    __slots__ = ('packed',)
+
+    def __init__(self, begin, target, is_ep_cap=False, is_castle=False, promotion=None):
+        # each square only has six bits, so a square off the board would silently become another square
+        if not (0 <= begin.r <= 7 and 0 <= begin.c <= 7 and 0 <= target.r <= 7 and 0 <= target.c <= 7):
+            raise ValueError(f'a move from {begin} to {target} is not on the board')
+        promotion = 0 if promotion is None else packed_promotions.index(promotion) + 1
+        self.packed = (begin.r * 8 + begin.c) | ((target.r * 8 + target.c) << 6) | \
+                      (promotion << 12) | (is_ep_cap << 16) | (is_castle << 17)
+
+    @property
+    def begin(self):
+        return positions[self.packed & 63]
+
+    @property
+    def target(self):
+        return positions[(self.packed >> 6) & 63]
+
+    @property
+    def is_ep_cap(self):
+        return bool(self.packed & (1 << 16))
+
+    @property
+    def is_castle(self):
+        return bool(self.packed & (1 << 17))
+
+    @property
+    def promotion(self):
+        promotion = (self.packed >> 12) & 15
+        return packed_promotions[promotion - 1] if promotion else None
 
     def __eq__(self, __o):
         return self.begin == __o.begin and self.target == __o.target
 
+    def __hash__(self):
+        return self.packed & 4095
+
+    def __reduce__(self):
+        return Move.unpack, (self.packed,)
+
     def __str__(self):
+        if self.promotion is not None:
+            return f'{self.begin} -> {self.target} = {self.promotion}'
         return f'{self.begin} -> {self.target}'
 
     def __repr__(self):
         return self.__str__()
+
+    def pack(self):
+        """Gets the move packed into a single integer"""
+        return self.packed
+
+    @classmethod
+    def unpack(cls, packed):
+        """Reconstructs a move from the integer created by pack"""
+        move = object.__new__(cls)
+        move.packed = packed
+        return move
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from legal import generate_legal_moves
+
+
+class MoveCache:
+    """A bounded cache of the legal moves in each position, keyed by the zobrist hash of the board.
+    The hash covers the player to move, the pawn that can be captured with en passant and every rook that can
+    still castle, so a position whose en passant or castling rights have changed is a different key and never
+    gets a stale move list. Once full, the least recently used position is evicted"""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, board):
+        return board.hash in self.entries
+
+    def clear(self):
+        """Empties the cache and resets the counters"""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, board):
+        """Gets the moves stored for a board, or None if they haven't been stored"""
+        moves = self.entries.get(board.hash)
+        if moves is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(board.hash)
+        return moves
+
+    def store(self, board, moves):
+        """Stores the moves for a board. They are kept as a tuple, since the same moves are handed to every caller"""
+        self.entries[board.hash] = tuple(moves)
+        self.entries.move_to_end(board.hash)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def moves(self, board):
+        """Gets the legal moves for the player to move on a board, generating and storing them if needed"""
+        moves = self.lookup(board)
+        if moves is None:
+            moves = generate_legal_moves(board, board.isLightTurn)
+            self.store(board, moves)
+            moves = self.entries[board.hash]
+        return moves
+
+    def hit_rate(self):
+        """The fraction of lookups which found the moves"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Summarises the usage of the cache"""
+        return {'size': len(self), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate()}
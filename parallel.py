@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import util
+from search import Search
+from transposition import SharedTranspositionTable
+
+
+# the search run by a helper process, created once when the helper starts and attached to the shared table
+helper_search = None
+
+
+def helper_context():
+    """Gets the way helper processes are started. Searches run on background threads, and forking a process while
+    another thread holds a lock, such as the one on stdin, leaves the lock held forever in the child. Helpers are
+    started from a fork server or a fresh interpreter instead, which never copies the locks of this process"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def init_helper(table, stop_event, tablebase=None):
+    global helper_search
+    helper_search = Search(table=table, stop_event=stop_event, tablebase=tablebase)
+    # detach from the shared table when the helper exits, so that its views of the memory are released
+    util.Finalize(None, table.close, exitpriority=10)
+
+
+def ready():
+    return os.getpid()
+
+
+def run_helper(board, max_depth, time_limit, min_depth):
+    """Searches a board in a helper process until the main search sets the stop event, returning the nodes searched.
+    The result itself is thrown away, since all the main search needs from a helper is what it stores in the table"""
+    helper_search.search(board, max_depth, time_limit, min_depth=min_depth)
+    return helper_search.nodes
+
+
+class ParallelSearch:
+    """A lazy SMP search. Helper processes search the same position as the main search, all sharing one
+    transposition table, so each finds the results the others stored and is sent down different lines by them.
+    Half of the helpers start one ply deeper to spread the work out further. The main search runs in this process
+    and decides the move, and the helpers are stopped as soon as it finishes"""
+
+    def __init__(self, workers=None, hash_mb=16, book=None, tablebase=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.table = SharedTranspositionTable(hash_mb)
+        context = helper_context()
+        self.stop_event = context.Event()
+        self.main = Search(table=self.table, book=book, tablebase=tablebase)
+        self.executor = None
+        # the helpers are started once and reused for every search, since starting a process is slow
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers - 1, mp_context=context,
+                                                initializer=init_helper,
+                                                initargs=(self.table, self.stop_event, tablebase))
+            # the pool only starts a helper when work is submitted, so start them all now rather than on the
+            # thread of the first search. Every task is submitted before any can finish, so each gets a new helper
+            for future in [self.executor.submit(ready) for _ in range(self.workers - 1)]:
+                future.result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def stop(self):
+        """Asks a running search to stop as soon as possible and return the best move found so far"""
+        self.main.stop()
+        self.stop_event.set()
+
+    def search(self, board, max_depth=64, time_limit=None, node_limit=None, on_iteration=None):
+        """Searches a board for the best move for the player to move using every worker.
+        Takes the same limits as Search.search, with node_limit only counting the nodes of the main search"""
+        # a book move is answered before any helper is woken up
+        book_result = self.main.book_move(board)
+        if book_result is not None:
+            return book_result
+
+        self.stop_event.clear()
+        helpers = []
+        if self.executor is not None:
+            helpers = [self.executor.submit(run_helper, board, max_depth, time_limit, 1 + i % 2)
+                       for i in range(self.workers - 1)]
+
+        try:
+            result = self.main.search(board, max_depth, time_limit, node_limit, on_iteration)
+        finally:
+            self.stop_event.set()
+            helper_nodes = sum(helper.result() for helper in helpers)
+
+        result.nodes += helper_nodes
+        return result
+
+    def close(self):
+        """Shuts down the helpers and frees the shared table"""
+        if self.executor is not None:
+            self.stop_event.set()
+            self.executor.shutdown()
+            self.executor = None
+        self.table.close()
+        self.table.unlink()
+
+
+def find_best_move(board, max_depth=64, time_limit=None, node_limit=None, hash_mb=16, workers=None, book=None,
+                   tablebase=None):
+    """Searches a board for the best move for the player to move with a fresh parallel search"""
+    with ParallelSearch(workers, hash_mb, book, tablebase) as search:
+        return search.search(board, max_depth, time_limit, node_limit)
@@ -0,0 +1,170 @@
+import argparse
+import sys
+import time
+from board import Board
+from fen import read_fen
+from legal import generate_legal_moves, generate_legal_bitboard_moves
+from transposition import TranspositionTable
+
+
+# standard positions with known leaf node counts for each depth, starting at a depth of one.
+# each entry is a name, a board string encoding, whether light is to move and the node counts
+benchmark_suite = [
+    ('start', Board.default_board, True,
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r1eeekeer1p01ep01p01qp01bebneep01np01eeeeP01Neeeep01eeP01eeeeeNeeQep01P01P01P01BBP01P01P01R1eeeKeeR1',
+     True, [48, 2039, 97862, 4085603]),
+    ('endgame', 'eeeeeeeeeep01eeeeeeeep01eeeeKP01eeeeer0eR0eeep01ekeeeeeeeeeeeeP01eP01eeeeeeeee', True,
+     [14, 191, 2812, 43238, 674624]),
+    ('promotions', 'r1eeekeer1P01p01p01p01ep01p01p01ebeeenbNnP01eeeeeeBBP01eP01eeeqeeeeNeeP01p01eP01eeP01P01R0eeQeR0Ke',
+     True, [6, 264, 9467, 422333]),
+    ('discovered', 'r0nbqeker0p01p01eP01bp01p01p01eep01eeeeeeeeeeeeeeeBeeeeeeeeeeeeeP01P01P01eNnP01P01R1NBQKeeR1', True,
+     [44, 1486, 62379, 2103487]),
+    ('middlegame', 'r0eeeer0keep01p01eqp01p01p01p01enp01eneeeebep01eBeeeBeP01ebeP01eNP01eNeeeP01P01eQP01P01P01R0eeeeR0Ke',
+     True, [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(board, depth, table=None):
+    """Counts the leaf nodes of the legal move tree to a given depth, making and unmaking moves on a board.
+    If a transposition table is given, the counts below positions reached by different move orders are reused"""
+    if table is not None and depth > 1:
+        entry = table.probe(board.hash)
+        if entry is not None and entry.depth == depth:
+            return entry.value
+
+    moves = generate_legal_moves(board, board.isLightTurn)
+    # the moves at the last level only need to be counted, not made
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1, table)
+        board.unmake_move()
+
+    if table is not None:
+        table.store(board.hash, nodes, depth)
+    return nodes
+
+
+def perft_bitboard(bitboards, depth, isLight):
+    """Counts the leaf nodes of the legal move tree to a given depth, copying and making moves on bitboards"""
+    moves = generate_legal_bitboard_moves(bitboards, isLight)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        child = bitboards.copy()
+        child.make_move(move)
+        nodes += perft_bitboard(child, depth - 1, not isLight)
+    return nodes
+
+
+def divide(board, depth, backend='board', table=None):
+    """Counts the leaf nodes below each legal root move. Returns a list of (move, nodes) pairs"""
+    results = []
+    for move in generate_legal_moves(board, board.isLightTurn):
+        board.make_move(move)
+        if backend == 'bitboard':
+            nodes = perft_bitboard(board.to_bitboard(), depth - 1, board.isLightTurn)
+        else:
+            nodes = perft(board, depth - 1, table)
+        board.unmake_move()
+        results.append((move, nodes))
+    return results
+
+
+def run_perft(board, depth, backend='board', table=None):
+    """Runs perft with the chosen backend and times it. Returns the node count and the elapsed seconds"""
+    start = time.perf_counter()
+    if backend == 'bitboard':
+        nodes = perft_bitboard(board.to_bitboard(), depth, board.isLightTurn)
+    else:
+        nodes = perft(board, depth, table)
+    return nodes, time.perf_counter() - start
+
+
+def nodes_per_second(nodes, elapsed):
+    return int(nodes / elapsed) if elapsed > 0 else 0
+
+
+def run_benchmark(depth, backend='board', hash_mb=0, out=sys.stdout):
+    """Runs every position in the benchmark suite to a given depth, or the deepest known count if shallower.
+    Reports the throughput of each and returns whether every node count matched the known value"""
+    passed = True
+    total_nodes, total_time = 0, 0.0
+
+    for name, encoding, isLight, counts in benchmark_suite:
+        d = min(depth, len(counts))
+        table = TranspositionTable(hash_mb) if hash_mb else None
+        nodes, elapsed = run_perft(Board(encoding, isLight), d, backend, table)
+        ok = nodes == counts[d - 1]
+        passed = passed and ok
+        total_nodes += nodes
+        total_time += elapsed
+        print(f'{name:<12} depth {d}  {nodes:>9} nodes  {elapsed:8.3f}s  {nodes_per_second(nodes, elapsed):>9} nps  '
+              f'{"ok" if ok else f"FAILED, expected {counts[d - 1]}"}', file=out)
+
+    print(f'{"total":<12}          {total_nodes:>9} nodes  {total_time:8.3f}s  '
+          f'{nodes_per_second(total_nodes, total_time):>9} nps', file=out)
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count the leaf nodes of the legal move tree to measure the '
+                                                 'speed and correctness of move generation')
+    parser.add_argument('depth', type=int, help='the number of plies to search')
+    parser.add_argument('--board', default=Board.default_board, help='a board string encoding to start from')
+    parser.add_argument('--fen', help='a FEN string to start from instead of a board string encoding')
+    parser.add_argument('--dark', action='store_true', help='start with the dark player to move')
+    parser.add_argument('--divide', action='store_true', help='report the node count below each root move')
+    parser.add_argument('--bench', action='store_true', help='run the benchmark suite of standard positions')
+    parser.add_argument('--backend', choices=['board', 'bitboard'], default='board',
+                        help='the board representation to generate moves on')
+    parser.add_argument('--hash', type=float, default=0, metavar='MB',
+                        help='the size of a transposition table to reuse counts with, disabled by default')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='count calls, moves and time in each move generator and write them to a JSON file, '
+                             'or as folded stacks for a flame graph if the path ends with .folded')
+    args = parser.parse_args(argv)
+
+    profiler = None
+    if args.profile:
+        from profiler import Profiler
+        profiler = Profiler()
+        profiler.enable()
+    try:
+        return run(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.write(args.profile)
+
+
+def run(args):
+    if args.bench:
+        return 0 if run_benchmark(args.depth, args.backend, args.hash) else 1
+
+    board = read_fen(args.fen) if args.fen else Board(args.board, not args.dark)
+    table = TranspositionTable(args.hash) if args.hash else None
+    start = time.perf_counter()
+    if args.divide:
+        results = divide(board, args.depth, args.backend, table)
+        for move, nodes in results:
+            print(f'{move}: {nodes}')
+        nodes = sum(nodes for _, nodes in results)
+    else:
+        nodes, _ = run_perft(board, args.depth, args.backend, table)
+    elapsed = time.perf_counter() - start
+
+    print(f'nodes {nodes}  time {elapsed:.3f}s  nps {nodes_per_second(nodes, elapsed)}')
+    if table is not None:
+        print(f'hash hits {table.hits}  misses {table.misses}  hit rate {table.hit_rate():.1%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import gzip
+import re
+from dataclasses import dataclass, field
+from board import Board
+from fen import read_fen, files
+from legal import generate_legal_moves
+
+
+# a tag pair such as [Event "Casual game"]
+tag_pattern = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# the tokens of movetext: comment and variation delimiters, or anything else up to whitespace
+token_pattern = re.compile(r'[{}();]|[^\s{}();]+')
+# a move in standard algebraic notation once check and annotation marks have been removed
+san_pattern = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+# move numbers such as 12. or 12...
+move_number_pattern = re.compile(r'^\d+\.+$')
+
+results = {'1-0', '0-1', '1/2-1/2', '*'}
+
+
+@dataclass
+class Game:
+    """A class for representing a single game record, holding its tags and its moves in algebraic notation"""
+    headers: dict = field(default_factory=dict)
+    moves: list = field(default_factory=list)
+    result: str = '*'
+
+
+def open_pgn(path):
+    """Opens a PGN file for reading as text, decompressing it on the fly if it is gzipped"""
+    with open(path, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+    if is_gzip:
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def read_games(lines):
+    """Reads games one at a time from an iterable of lines, such as an open file. Only the game being read is held
+    in memory, so files of any size can be streamed. Comments, variations and annotation glyphs are skipped"""
+    game = Game()
+    in_movetext = False
+    comment_depth = 0       # inside {...}, which can span lines
+    variation_depth = 0     # inside (...), which can be nested
+
+    for line in lines:
+        stripped = line.strip()
+
+        # tags are only read outside of comments, and a tag after movetext starts a new game
+        if comment_depth == 0 and stripped.startswith('['):
+            if in_movetext:
+                yield game
+                game, in_movetext, variation_depth = Game(), False, 0
+            match = tag_pattern.match(stripped)
+            if match:
+                game.headers[match.group(1)] = match.group(2)
+            continue
+
+        for token in token_pattern.findall(stripped):
+            if comment_depth:
+                if token == '}':
+                    comment_depth = 0
+                continue
+            if token == '{':
+                comment_depth = 1
+            elif token == ';':
+                # the rest of the line is a comment
+                break
+            elif token == '(':
+                variation_depth += 1
+            elif token == ')':
+                variation_depth = max(0, variation_depth - 1)
+            elif variation_depth or token.startswith('$') or move_number_pattern.match(token):
+                continue
+            elif token in results:
+                game.result = token
+                yield game
+                game, in_movetext = Game(), False
+            else:
+                # strip any move number glued to the move, such as 12.e4
+                token = token.split('.')[-1]
+                if token:
+                    game.moves.append(token)
+                    in_movetext = True
+
+    # a final game without a result
+    if in_movetext or game.moves:
+        yield game
+
+
+def parse_san(board, san):
+    """Finds the legal move on a board for the player to move described by a move in standard algebraic notation"""
+    text = san.rstrip('+#!?')
+    moves = generate_legal_moves(board, board.isLightTurn)
+
+    # castling, which some files write with zeros
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        column = 6 if len(text) == 3 else 2
+        for move in moves:
+            if move.is_castle and move.target.c == column:
+                return move
+        raise ValueError(f'illegal castle {san}')
+
+    match = san_pattern.match(text)
+    if match is None:
+        raise ValueError(f'unreadable move {san}')
+    code, file, rank, target, promotion = match.groups()
+    code = code or 'P'
+    target_c, target_r = files.index(target[0]), 8 - int(target[1])
+
+    candidates = []
+    for move in moves:
+        if move.target.r != target_r or move.target.c != target_c:
+            continue
+        piece = board.board[move.begin.r, move.begin.c]
+        if piece.code.upper() != code:
+            continue
+        if file is not None and move.begin.c != files.index(file):
+            continue
+        if rank is not None and move.begin.r != 8 - int(rank):
+            continue
+        if (move.promotion or '').upper() != (promotion or ''):
+            continue
+        candidates.append(move)
+
+    if len(candidates) != 1:
+        raise ValueError(f'{"ambiguous" if candidates else "illegal"} move {san}')
+    return candidates[0]
+
+
+def replay(game):
+    """Replays a game, yielding the board before each move along with the move. The same board is updated in place
+    as the game goes on, so copy it if a position needs to be kept after the next move is read"""
+    board = read_fen(game.headers['FEN']) if 'FEN' in game.headers else Board()
+    for san in game.moves:
+        move = parse_san(board, san)
+        yield board, move
+        board.make_move(move)
+
+
+def read_positions(path):
+    """Streams every position from every game in a PGN file, yielding the game, the board before each move and
+    the move. Games with moves that can't be read are skipped from the first bad move on"""
+    with open_pgn(path) as f:
+        for game in read_games(f):
+            try:
+                for board, move in replay(game):
+                    yield game, board, move
+            except ValueError:
+                continue
@@ -1,43 +1,72 @@
-from dataclasses import dataclass
+from abc import ABC, abstractmethod
 from position import Position
 from move import Move
+from attacks import knight_targets, king_targets, rays, rook_directions, bishop_directions, queen_directions
+from bitboard import square, to_position, iterate_bits, knight_attacks, king_attacks, rook_attacks, \
+                     bishop_attacks, queen_attacks, pawn_attacks, light_codes, dark_codes
+
+
+# every piece that has been created, keyed by its code and state
+flyweights = {}
 
 
 def create_piece(code, ep=None, can_ep=None, can_castle=None):
-    if code == 'r':
-        return Rook(code, './chess_icons/dr.png', False, can_castle)
-    elif code == 'n':
-        return Knight(code, './chess_icons/dkn.png', False)
-    elif code == 'b':
-        return Bishop(code, './chess_icons/db.png', False)
-    elif code == 'q':
-        return Queen(code, './chess_icons/dq.png', False)
-    elif code == 'k':
-        return King(code, './chess_icons/dk.png', False)
-    elif code == 'p':
-        return Pawn(code, './chess_icons/dp.png', False, ep, can_ep)
-    elif code == 'R':
-        return Rook(code, './chess_icons/lr.png', True, can_castle)
-    elif code == 'N':
-        return Knight(code, './chess_icons/lkn.png', True)
-    elif code == 'B':
-        return Bishop(code, './chess_icons/lb.png', True)
-    elif code == 'Q':
-        return Queen(code, './chess_icons/lq.png', True)
-    elif code == 'K':
-        return King(code, './chess_icons/lk.png', True)
-    elif code == 'P':
-        return Pawn(code, './chess_icons/lp.png', True, ep, can_ep)
-
-
-@dataclass
-class Piece:
+    """Gets the piece for a code and state. Pieces are immutable, so a single instance of each combination
+    of code and state is shared between every board. Returns None for any code that isn't a piece"""
+    # only pawns and rooks carry state
+    key = (code, bool(ep) and code in 'pP', bool(can_ep) and code in 'pP', bool(can_castle) and code in 'rR')
+    piece = flyweights.get(key)
+    if piece is not None:
+        return piece
+
+    isLight = code.isupper()
+    if code in 'rR':
+        piece = Rook(code, isLight, bool(can_castle))
+    elif code in 'nN':
+        piece = Knight(code, isLight)
+    elif code in 'bB':
+        piece = Bishop(code, isLight)
+    elif code in 'qQ':
+        piece = Queen(code, isLight)
+    elif code in 'kK':
+        piece = King(code, isLight)
+    elif code in 'pP':
+        piece = Pawn(code, isLight, bool(ep), bool(can_ep))
+    else:
+        return None
+
+    flyweights[key] = piece
+    return piece
+
+
+def generate_bitboard_moves(bitboards, isLight):
+    """Generates all of the possible moves for one player on a bitboard"""
+    moves = []
+
+    for code in (light_codes if isLight else dark_codes):
+        # a single piece can generate the moves for every piece of the same type
+        piece = create_piece(code)
+        for sq in iterate_bits(bitboards.pieces[code]):
+            moves.extend(piece.generate_bitboard_moves(bitboards, to_position(sq), isLight))
+
+    return moves
+
+
+class Piece(ABC):
     """A class for representing a single piece on the board. 
-    Constructor takes a single unique character code for a piece and constructs the piece accordingly"""
-    # piece data
-    code: str
-    image: str
-    isLight: bool
+    Constructor takes a single unique character code for a piece and constructs the piece accordingly.
+    Pieces are immutable and shared, so changing the state of a piece means replacing it with another from create_piece"""
+    __slots__ = ('code', 'isLight')
+
+    def __init__(self, code, isLight):
+        object.__setattr__(self, 'code', code)
+        object.__setattr__(self, 'isLight', isLight)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Pieces are immutable, use create_piece to get a piece with a different state')
+
+    def __reduce__(self):
+        return create_piece, (self.code,)
 
     def __str__(self):
         return self.code
@@ -45,167 +74,119 @@ class Piece:
     def __repr__(self):
         return self.__str__()
 
-    def march(self, pos, offset, board, direction=None, unblocked_directions=None):
-        """A method to allow a piece to march in a provided direction provided it is not blocked.
-        Wraps a number of common function calls together to make move calculation much more simple.
-        Returns a move to a position at a given offset if possible, otherwise none."""            
-        # calculate the position of the target
-        target = pos + offset
-
-        # case for tracking directions
-        if unblocked_directions is not None and direction is not None:
-            # if the direction is blocked or the target isn't on the board then stop now
-            if not unblocked_directions[direction] or not target.is_on_board():
-                return unblocked_directions, None
-            # if the tile is empty, a move is possible
-            if board.board[target.r, target.c] is None:
-                return unblocked_directions, Move(pos, target)
-            # if a tile contains an enemy piece, a move is possible but the direction is blocked
-            if target.contains_enemy_piece(board, self.isLight):
-                unblocked_directions[direction] = False
-                return unblocked_directions, Move(pos, target)
-            # if the tile contains an allied piece, the a move is impossible and the direction is blocked
-            if target.contains_allied_piece(board, self.isLight):
-                unblocked_directions[direction] = False
-                return unblocked_directions, None
-                
-        # a move is possible so long as the target tile is on the board and doesn't contain an allied piece
-        if target.is_on_board() and not target.contains_allied_piece(board, self.isLight):
-            return Move(pos, target)
-    
-        # no move was possible
-        return None
-
+    def jump(self, board, pos, targets):
+        """Generates a move to each precomputed target tile that doesn't contain an allied piece"""
+        moves = []
+        for target in targets:
+            piece = board.board[target.r, target.c]
+            if piece is None or piece.isLight != self.isLight:
+                moves.append(Move(pos, target))
+        return moves
 
-class Rook(Piece):
-    can_castle: bool
+    def slide(self, board, pos, slide_directions):
+        """Generates moves along the precomputed ray in each direction until the ray is blocked.
+        A ray blocked by an enemy piece includes a move capturing it"""
+        moves = []
+        sq = pos.r * 8 + pos.c
+        for direction in slide_directions:
+            for target in rays[direction][sq]:
+                piece = board.board[target.r, target.c]
+                # empty tiles can be moved to and the ray continues
+                if piece is None:
+                    moves.append(Move(pos, target))
+                    continue
+                # enemy pieces can be captured, but either way the ray is blocked
+                if piece.isLight != self.isLight:
+                    moves.append(Move(pos, target))
+                break
+        return moves
 
-    def __init__(self, code, image, isLight, canCaste):
-        super(Rook, self).__init__(code, image, isLight)
-        self.can_castle = canCaste
+    @abstractmethod
+    def bitboard_attacks(self, bitboards, sq):
+        """Calculates a mask of every tile the piece attacks from a square on a bitboard"""
 
-    def generate_moves(self, board, pos, isLight):
-        """Generates all of the moves possible for the current piece given that it is a rook"""
-        moves = []
+    def generate_bitboard_moves(self, bitboards, pos, isLight):
+        """Generates all of the moves possible for the current piece on a bitboard.
+        A move is possible to any attacked tile that doesn't contain an allied piece"""
+        targets = self.bitboard_attacks(bitboards, square(pos)) & ~bitboards.allies(isLight)
+        return bitboards.moves_to(pos, targets)
 
-        # named booleans for whether each direction is blocked and a list of names
-        unblocked_directions = {'N': True, 'E': True, 'S': True, 'W': True}
-        directions = ['N', 'E', 'S', 'W']
 
-        # traverse the maximum range in each direction
-        for d in range(1, 8):
-            # all of the posible offsets for a rook
-            offsets = [Position(-d, 0), Position(0, d), Position(d, 0), Position(0, -d)]
-            # for each offset/direction, attempt to march d tiles and track if an obstruction is found
-            for i, offset in enumerate(offsets):
-                # attempt to march
-                unblocked_directions, move = self.march(pos, offset, board, directions[i], unblocked_directions)
+class Rook(Piece):
+    __slots__ = ('can_castle',)
 
-                # if a valid move was found then add it
-                if move is not None:
-                    moves.append(move)
+    def __init__(self, code, isLight, can_castle):
+        super(Rook, self).__init__(code, isLight)
+        object.__setattr__(self, 'can_castle', can_castle)
 
-        return moves
+    def __reduce__(self):
+        return create_piece, (self.code, None, None, self.can_castle)
 
+    def bitboard_attacks(self, bitboards, sq):
+        return rook_attacks(sq, bitboards.occupied)
 
-class Knight(Piece):
     def generate_moves(self, board, pos, isLight):
         """Generates all of the moves possible for the current piece given that it is a rook"""
-        moves = []
+        return self.slide(board, pos, rook_directions)
 
-        # offsets representing the eight places a knight can attack
-        offsets = [Position(-2, 1), Position(-1, 2), Position(1, 2), Position(2, 1), 
-                   Position(2, -1), Position(1, -2), Position(-1, -2), Position(-2, -1)]
 
-        for offset in offsets:
-            # attempt to march by jumping to the offset
-            move = self.march(pos, offset, board)
+class Knight(Piece):
+    __slots__ = ()
 
-            if move is not None:
-                moves.append(move)
+    def bitboard_attacks(self, bitboards, sq):
+        return knight_attacks(sq)
 
-        return moves
+    def generate_moves(self, board, pos, isLight):
+        """Generates all of the moves possible for the current piece given that it is a knight"""
+        return self.jump(board, pos, knight_targets[pos.r * 8 + pos.c])
 
 
 class Bishop(Piece):
-    def generate_moves(self, board, pos, isLight):
-        """Generates all of the moves possible for the current piece given that it is a bishop"""
-        moves = []
+    __slots__ = ()
 
-        # named booleans for whether each direction is blocked and a list of names
-        unblocked_directions = {'NE': True, 'SE': True, 'SW': True, 'NW': True}
-        directions = ['NE', 'SE', 'SW', 'NW']
+    def bitboard_attacks(self, bitboards, sq):
+        return bishop_attacks(sq, bitboards.occupied)
 
-        # traverse the maximum range in each direction
-        for d in range(1, 8):
-            # all of the posible offsets for a bishop
-            offsets = [Position(-d, d), Position(d, d), Position(d, -d), Position(-d, -d)]
-            # for each offset/direction, attempt to march d tiles and track if an obstruction is found
-            for i, offset in enumerate(offsets):
-                # attempt to march
-                unblocked_directions, move = self.march(pos, offset, board, directions[i], unblocked_directions)
+    def generate_moves(self, board, pos, isLight):
+        """Generates all of the moves possible for the current piece given that it is a bishop"""
+        return self.slide(board, pos, bishop_directions)
 
-                # if a valid move was found then add it
-                if move is not None:
-                    moves.append(move)
 
-        return moves
+class Queen(Piece):
+    __slots__ = ()
 
+    def bitboard_attacks(self, bitboards, sq):
+        return queen_attacks(sq, bitboards.occupied)
 
-class Queen(Piece):
     def generate_moves(self, board, pos, isLight):
         """Generates all of the moves possible for the current piece given that it is a queen"""
-        moves = []
-
-        # named booleans for whether each direction is blocked and a list of names
-        unblocked_directions = {'N': True, 'NE': True, 'E': True, 'SE': True, 'S': True, 'SW': True, 'W': True, 'NW': True}
-        directions = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+        return self.slide(board, pos, queen_directions)
 
-        # traverse the maximum range in each direction
-        for d in range(1, 8):
-            # all of the posible offsets for a queen
-            offsets = [Position(-d, 0), Position(-d, d), Position(0, d), Position(d, d), 
-                       Position(d, 0), Position(d, -d), Position(0, -d), Position(-d, -d)]
-            # for each offset/direction, attempt to march d tiles and track if an obstruction is found
-            for i, offset in enumerate(offsets):
-                # attempt to march
-                unblocked_directions, move = self.march(pos, offset, board, directions[i], unblocked_directions)
 
-                # if a valid move was found then add it
-                if move is not None:
-                    moves.append(move)
-
-        return moves
+class King(Piece):
+    __slots__ = ()
 
+    def bitboard_attacks(self, bitboards, sq):
+        return king_attacks(sq)
 
-class King(Piece):
     def generate_moves(self, board, pos, isLight):
-        """Generates all of the moves possible for the current piece given that it is a queen"""
-        moves = []
+        """Generates all of the moves possible for the current piece given that it is a king"""
+        return self.jump(board, pos, king_targets[pos.r * 8 + pos.c])
 
-        # all of the posible offsets for a king
-        offsets = [Position(-1, 0), Position(-1, 1), Position(0, 1), Position(1, 1), 
-                    Position(1, 0), Position(1, -1), Position(0, -1), Position(-1, -1)]
-        # for each offset/direction, attempt to march d tiles and track if an obstruction is found
-        for offset in offsets:
-            # attempt to march
-            move = self.march(pos, offset, board)
 
-            # if a valid move was found then add it
-            if move is not None:
-                moves.append(move)
-
-        return moves
+class Pawn(Piece):
+    __slots__ = ('en_passant', 'can_ep_cap')
 
+    def __init__(self, code, isLight, ep, can_ep):
+        super(Pawn, self).__init__(code, isLight)
+        object.__setattr__(self, 'en_passant', ep)
+        object.__setattr__(self, 'can_ep_cap', can_ep)
 
-class Pawn(Piece):
-    en_passant: bool
-    can_ep_cap: bool
+    def __reduce__(self):
+        return create_piece, (self.code, self.en_passant, self.can_ep_cap)
 
-    def __init__(self, code, image, isLight, ep, can_ep):
-        super(Pawn, self).__init__(code, image, isLight)
-        self.en_passant = ep
-        self.can_ep_cap = can_ep
+    def bitboard_attacks(self, bitboards, sq):
+        return pawn_attacks(sq, self.isLight)
     
     def generate_moves(self, board, pos, isLight):
         """Generates all of the moves possible for the current piece given that it is a pawn"""
@@ -279,3 +260,43 @@ class Pawn(Piece):
                     moves.append(Move(pos, Position(east.r + offset, east.c), True))
 
         return moves
+
+    def generate_bitboard_moves(self, bitboards, pos, isLight):
+        """Generates all of the moves possible for the current piece on a bitboard given that it is a pawn"""
+        sq = square(pos)
+
+        # check for en passant
+        moves = self.check_bitboard_en_passant(bitboards, pos, isLight)
+
+        # pawns can only move diagonally to capture
+        targets = self.bitboard_attacks(bitboards, sq) & bitboards.enemies(isLight)
+
+        # light pawns move up the board and dark pawns move down it
+        step, start_row = (-8, 6) if isLight else (8, 1)
+        one = sq + step
+        # a pawn can advance one tile onto an empty tile, and two from its starting row if neither is blocked
+        if 0 <= one < 64 and not bitboards.occupied & (1 << one):
+            targets |= 1 << one
+            if pos.r == start_row and not bitboards.occupied & (1 << (one + step)):
+                targets |= 1 << (one + step)
+
+        moves.extend(bitboards.moves_to(pos, targets))
+        return moves
+
+    def check_bitboard_en_passant(self, bitboards, pos, isLight):
+        moves = []
+
+        # the current pawn must still be able to capture with en passant
+        if not bitboards.can_ep_cap & (1 << square(pos)):
+            return moves
+
+        offset = -1 if isLight else 1
+        # enemy pawns which have just moved two tiles
+        targets = bitboards.pieces['p' if isLight else 'P'] & bitboards.en_passant
+
+        # check for a capturable pawn directly to the west and east, accounting for the boundaries of the board
+        for c in (pos.c - 1, pos.c + 1):
+            if 0 <= c <= 7 and targets & (1 << (pos.r * 8 + c)):
+                moves.append(Move(pos, Position(pos.r + offset, c), True))
+
+        return moves
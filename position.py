@@ -1,17 +1,35 @@
-from dataclasses import dataclass
+# the 64 shared positions on the board, indexed by r * 8 + c
+positions = []
 
 
-@dataclass
 class Position:
     """A class for representing a single position as a set of coordinates.
-    Coordinates are encoded (r, c) where r is the row and c is the column, 
-    with the origin being in the top left"""
-    r: int
-    c: int
+    Coordinates are encoded (r, c) where r is the row and c is the column,
+    with the origin being in the top left. Positions are immutable, and every position on the board
+    is interned so that constructing one returns a shared instance rather than allocating a new one"""
+    __slots__ = ('r', 'c')
+
+    def __new__(cls, r, c):
+        if 0 <= r <= 7 and 0 <= c <= 7 and len(positions) == 64:
+            return positions[r * 8 + c]
+        # positions off the board are still needed to check whether a move leaves the board
+        pos = object.__new__(cls)
+        object.__setattr__(pos, 'r', r)
+        object.__setattr__(pos, 'c', c)
+        return pos
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Position is immutable')
+
+    def __reduce__(self):
+        return Position, (self.r, self.c)
 
     def __eq__(self, __o):
         return __o.r == self.r and __o.c == self.c
 
+    def __hash__(self):
+        return hash((self.r, self.c))
+
     def __add__(self, __o):
         return Position(self.r + __o.r, self.c + __o.c)
 
@@ -39,3 +57,6 @@ class Position:
     def contains_allied_piece(self, board, isLight):
         """Checks if a tile on a given board contains an allied piece"""
         return board.board[self.r, self.c] is not None and board.board[self.r, self.c].isLight == isLight
+
+
+positions.extend(Position(sq // 8, sq % 8) for sq in range(64))
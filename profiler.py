@@ -0,0 +1,158 @@
+import json
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+import legal
+
+
+# the functions of the legal move generator which are counted
+legal_functions = ['generate_legal_moves', 'generate_legal_bitboard_moves', 'generate_packed_moves',
+                   'generate_king_moves', 'generate_piece_moves', 'generate_pawn_moves', 'generate_en_passant',
+                   'generate_castles', 'attacked_squares', 'pin_masks']
+
+# knights, bishops, rooks and queens share a generator, so its calls are counted under the piece they were for
+piece_names = {'N': 'knight', 'B': 'bishop', 'R': 'rook', 'Q': 'queen'}
+
+
+@dataclass
+class CallStats:
+    """A class for representing the counters kept for one instrumented function"""
+    calls: int = 0
+    moves: int = 0              # the number of moves returned
+    time_ns: int = 0            # the total time spent in the function, including anything it called
+    self_ns: int = 0            # the time spent in the function, less the time spent in other instrumented functions
+    outcomes: dict = field(default_factory=dict)    # counts of what each call produced, such as moves by piece
+
+
+def count_moves(stats, args, result):
+    stats.moves += len(result)
+
+
+def count_moves_by_piece(stats, args, result):
+    """Counts the legal moves produced for each type of piece"""
+    board = args[0]
+    stats.moves += len(result)
+    for move in result:
+        kind = type(board.board[move.begin.r, move.begin.c]).__name__
+        stats.outcomes[kind] = stats.outcomes.get(kind, 0) + 1
+
+
+class Profiler:
+    """An opt-in instrumentation layer for move generation. While enabled, the functions of the legal move generator,
+    including the generator for each type of piece, are replaced with wrappers that count calls, moves produced
+    and time spent. While disabled the original functions are put back, so there is no cost at all.
+    Counters can be exported as JSON, or as folded stacks for flame graph tools"""
+
+    def __init__(self):
+        self.stats = {}
+        # the self time spent under each stack of instrumented calls, joined with semicolons
+        self.folded = {}
+        self.stack = []
+        self.child_ns = []
+        # the (owner, name, original) of everything replaced, so it can be put back
+        self.patches = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.disable()
+
+    @property
+    def enabled(self):
+        return bool(self.patches)
+
+    def reset(self):
+        self.stats = {}
+        self.folded = {}
+
+    def wrap(self, func, key, inspect=None):
+        """Creates a wrapper for a function which counts its calls and time under a key.
+        The key can be a function of the arguments, so that a generator shared by several pieces is counted per piece"""
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            name = key(args) if callable(key) else key
+            profiler.stack.append(name)
+            profiler.child_ns.append(0)
+            start = time.perf_counter_ns()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                children = profiler.child_ns.pop()
+                path = ';'.join(profiler.stack)
+                profiler.stack.pop()
+                if profiler.child_ns:
+                    profiler.child_ns[-1] += elapsed
+
+                stats = profiler.stats.get(name)
+                if stats is None:
+                    stats = profiler.stats[name] = CallStats()
+                stats.calls += 1
+                stats.time_ns += elapsed
+                stats.self_ns += elapsed - children
+                profiler.folded[path] = profiler.folded.get(path, 0) + elapsed - children
+
+            if inspect is not None:
+                inspect(stats, args, result)
+            return result
+
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def patch(self, owner, name, wrapper):
+        self.patches.append((owner, name, owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)))
+        setattr(owner, name, wrapper)
+
+    def enable(self):
+        """Replaces every instrumented function with its counting wrapper"""
+        if self.enabled:
+            return
+
+        # other modules import the legal generator by name, so every reference to it is replaced
+        for name in legal_functions:
+            original = getattr(legal, name)
+            inspect = count_moves_by_piece if name == 'generate_legal_moves' else \
+                count_moves if name.startswith('generate') else None
+            key = (lambda args: f'generate_{piece_names[args[1].upper()]}_moves') \
+                if name == 'generate_piece_moves' else name
+            wrapper = self.wrap(original, key, inspect)
+            for module in list(sys.modules.values()):
+                if getattr(module, name, None) is original:
+                    self.patch(module, name, wrapper)
+
+    def disable(self):
+        """Puts back every original function"""
+        for owner, name, original in reversed(self.patches):
+            setattr(owner, name, original)
+        self.patches = []
+
+    def report(self):
+        """Gets every counter as a dictionary, with times in milliseconds, slowest first"""
+        report = {}
+        for name, stats in sorted(self.stats.items(), key=lambda item: -item[1].self_ns):
+            entry = asdict(stats)
+            entry['time_ms'] = entry.pop('time_ns') / 1e6
+            entry['self_ms'] = entry.pop('self_ns') / 1e6
+            report[name] = entry
+        return report
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_folded(self, path):
+        """Writes the self time under each stack in microseconds, one stack per line, which flamegraph.pl,
+        speedscope and similar tools read directly"""
+        with open(path, 'w') as f:
+            for stack, ns in sorted(self.folded.items()):
+                f.write(f'{stack} {ns // 1000}\n')
+
+    def write(self, path):
+        """Writes the counters as folded stacks if the path ends with .folded, otherwise as JSON"""
+        if path.endswith('.folded'):
+            self.write_folded(path)
+        else:
+            self.write_json(path)
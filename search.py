@@ -0,0 +1,296 @@
+import time
+from dataclasses import dataclass, field
+from move import Move
+from legal import generate_legal_moves, is_in_check
+from evaluate import evaluate, piece_values
+from transposition import TranspositionTable, exact_bound, lower_bound, upper_bound
+
+
+# scores beyond the mate threshold are forced mates, with the distance to mate taken off the mate score
+mate_score: int = 100000
+mate_threshold: int = mate_score - 1000
+infinity: int = mate_score + 1
+
+# the deepest ply the search will reach, which bounds the killer move table
+max_ply: int = 128
+
+
+@dataclass
+class SearchResult:
+    """A class for representing the outcome of a search"""
+    move: Move                  # the best move found, or None if there are no legal moves
+    score: int                  # the score of the best move in centipawns for the player to move
+    depth: int                  # the deepest iteration that was completed
+    pv: list = field(default_factory=list)     # the principal variation, starting with the best move
+    nodes: int = 0
+    elapsed: float = 0.0
+
+    def __str__(self):
+        return f'depth {self.depth} score {self.score} nodes {self.nodes} time {self.elapsed:.3f}s pv {self.pv}'
+
+
+class Search:
+    """A negamax alpha-beta search with iterative deepening and a quiescence search at the leaves.
+    Moves are ordered by the transposition table move, then captures by most valuable victim and least valuable
+    attacker, then killer moves and finally the history heuristic. The search is bounded by a depth, a time budget
+    and a node budget, whichever runs out first, and can be stopped from another thread.
+    Given an opening book, positions in the book are answered with a book move without searching at all, and
+    given a tablebase, endgames it covers are scored exactly wherever they are reached"""
+
+    def __init__(self, table=None, hash_mb=16, stop_event=None, book=None, tablebase=None):
+        self.table = table if table is not None else TranspositionTable(hash_mb)
+        self.book = book
+        self.tablebase = tablebase
+        # an event that another process can set to stop the search, checked every few nodes since it is slow to read
+        self.stop_event = stop_event
+        self.stopped = False
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.cancelled = None
+        self.killers = [[-1, -1] for _ in range(max_ply)]
+        self.history = [0] * (64 * 64)
+        self.pv_table = [[] for _ in range(max_ply + 1)]
+
+    def stop(self):
+        """Asks a running search to stop as soon as possible and return the best move found so far"""
+        self.stopped = True
+
+    def search(self, board, max_depth=64, time_limit=None, node_limit=None, on_iteration=None, min_depth=1,
+               cancelled=None):
+        """Searches a board for the best move for the player to move. Each iteration searches one ply deeper,
+        starting at min_depth, until max_depth is reached, time_limit seconds have passed or node_limit nodes have
+        been searched. on_iteration is called with the result of every completed iteration.
+        cancelled is called as the search goes and stops it once it returns True. Unlike stop, which only reaches
+        a search that is already running, it also stops a search cancelled before it started"""
+        start = time.perf_counter()
+        self.stopped = False
+        self.nodes = 0
+        self.deadline = start + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.cancelled = cancelled
+        self.killers = [[-1, -1] for _ in range(max_ply)]
+        self.history = [0] * (64 * 64)
+
+        moves = generate_legal_moves(board, board.isLightTurn)
+        if not moves:
+            score = -mate_score if is_in_check(board, board.isLightTurn) else 0
+            return SearchResult(None, score, 0, [], 0, time.perf_counter() - start)
+
+        # a move from the book or the tablebase is played without searching
+        known = self.book_move(board) or self.tablebase_move(board, moves)
+        if known is not None:
+            if on_iteration is not None:
+                on_iteration(known)
+            return known
+
+        # until the first iteration completes, fall back on the first legal move
+        result = SearchResult(moves[0], 0, 0, [moves[0]], 0, 0.0)
+        for depth in range(min(min_depth, max_depth), max_depth + 1):
+            score = self.negamax(board, depth, -infinity, infinity, 0)
+            # an iteration cut short by the budget is incomplete, so its score and depth can't be trusted and it
+            # isn't reported. When no iteration has completed, the best move it found so far is still played
+            if self.stopped:
+                if result.depth == 0 and self.pv_table[0]:
+                    result.move = self.pv_table[0][0]
+                    result.pv = [result.move]
+                break
+            pv = list(self.pv_table[0])
+            result = SearchResult(pv[0] if pv else moves[0], score, depth, pv, self.nodes, time.perf_counter() - start)
+            if on_iteration is not None:
+                on_iteration(result)
+            if abs(score) > mate_threshold:
+                break
+            # the next iteration takes several times longer than this one, so don't start one that can't finish
+            if self.deadline is not None and time.perf_counter() + (time.perf_counter() - start) > self.deadline:
+                break
+
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def book_move(self, board):
+        """Gets a result holding a book move, or None if there is no book or the board is out of it"""
+        start = time.perf_counter()
+        move = self.book.choose(board) if self.book is not None else None
+        if move is None:
+            return None
+        return SearchResult(move, 0, 0, [move], 0, time.perf_counter() - start)
+
+    def tablebase_move(self, board, moves):
+        """Gets a result holding the best move from the tablebase, or None if there is no tablebase or it doesn't
+        cover every move from the board"""
+        start = time.perf_counter()
+        found = self.tablebase.best_move(board, moves) if self.tablebase is not None else None
+        if found is None:
+            return None
+        move, score = found
+        return SearchResult(move, score, 0, [move], 0, time.perf_counter() - start)
+
+    def check_budget(self):
+        """Stops the search once the time or node budget has run out"""
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.stopped = True
+        elif self.stop_event is not None and self.nodes & 1023 == 0 and self.stop_event.is_set():
+            self.stopped = True
+        elif self.cancelled is not None and self.cancelled():
+            self.stopped = True
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        """Scores a board for the player to move, searching depth plies within the window alpha to beta"""
+        self.pv_table[ply] = []
+        self.nodes += 1
+        self.check_budget()
+        if self.stopped:
+            return 0
+
+        if ply > 0 and self.is_repetition(board):
+            return 0
+
+        # an endgame covered by the tablebase has an exact score, so there is nothing left to search
+        if ply > 0 and self.tablebase is not None:
+            score = self.tablebase.score(board, ply)
+            if score is not None:
+                return score
+
+        if depth <= 0 or ply >= max_ply - 1:
+            return self.quiescence(board, alpha, beta, ply)
+
+        # use the result from the transposition table if it is deep enough to settle this node
+        original_alpha = alpha
+        table_move = -1
+        entry = self.table.probe(board.hash)
+        if entry is not None:
+            table_move = entry.move
+            if ply > 0 and entry.depth >= depth:
+                score = self.score_from_table(entry.value, ply)
+                if entry.bound == exact_bound or \
+                        (entry.bound == lower_bound and score >= beta) or \
+                        (entry.bound == upper_bound and score <= alpha):
+                    return score
+
+        moves = generate_legal_moves(board, board.isLightTurn)
+        # with no legal moves the game is over, either by checkmate or stalemate
+        if not moves:
+            return -mate_score + ply if is_in_check(board, board.isLightTurn) else 0
+
+        best_score, best_move = -infinity, -1
+        for move in self.order_moves(board, moves, table_move, ply):
+            board.make_move(move)
+            score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+
+            if score > best_score:
+                best_score, best_move = score, move.pack()
+            if score > alpha:
+                alpha = score
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+            if alpha >= beta:
+                # quiet moves that cause a cutoff are remembered as killers and in the history table
+                if not self.is_capture(board, move):
+                    self.store_killer(ply, best_move)
+                    self.history[best_move & 4095] += depth * depth
+                break
+
+        if best_score <= original_alpha:
+            bound = upper_bound
+        elif best_score >= beta:
+            bound = lower_bound
+        else:
+            bound = exact_bound
+        self.table.store(board.hash, self.score_to_table(best_score, ply), depth, bound, best_move)
+
+        return best_score
+
+    def quiescence(self, board, alpha, beta, ply):
+        """Searches only captures and promotions until the position is quiet, so that the evaluation isn't taken
+        in the middle of an exchange. The player to move may also decline every capture and stand pat"""
+        self.pv_table[ply] = []
+        self.check_budget()
+        if self.stopped:
+            return 0
+
+        score = evaluate(board)
+        stand_pat = score if board.isLightTurn else -score
+        # the tables indexed by ply have no rows past max_ply, so a capture sequence that long is cut short
+        if ply >= max_ply:
+            return stand_pat
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        moves = [move for move in generate_legal_moves(board, board.isLightTurn)
+                 if move.promotion is not None or self.is_capture(board, move)]
+        for move in self.order_moves(board, moves, -1, ply):
+            board.make_move(move)
+            self.nodes += 1
+            score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+
+        return alpha
+
+    def is_capture(self, board, move):
+        target = move.target
+        return move.is_ep_cap or bool(board.occupied >> (target.r * 8 + target.c) & 1)
+
+    def order_moves(self, board, moves, table_move, ply):
+        """Sorts moves so that the ones most likely to cause a cutoff are searched first"""
+        killers = self.killers[ply] if ply < max_ply else [-1, -1]
+
+        def priority(move):
+            packed = move.pack()
+            if packed == table_move:
+                return 1 << 30
+            victim = board.board[move.target.r, move.target.c]
+            if victim is not None or move.is_ep_cap:
+                # most valuable victim, least valuable attacker
+                attacker = board.board[move.begin.r, move.begin.c]
+                victim_value = piece_values['P'] if victim is None else piece_values[victim.code.upper()]
+                return (1 << 29) + victim_value * 16 - piece_values[attacker.code.upper()] // 100
+            if move.promotion is not None:
+                return (1 << 29) + piece_values[move.promotion.upper()]
+            if packed in killers:
+                return 1 << 28
+            return self.history[packed & 4095]
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def store_killer(self, ply, packed):
+        if ply < max_ply and self.killers[ply][0] != packed:
+            self.killers[ply] = [packed, self.killers[ply][0]]
+
+    def is_repetition(self, board):
+        """Checks if the position has been seen before with the same player to move"""
+        for undo in board.history[-2::-2]:
+            if undo.hash == board.hash:
+                return True
+        return False
+
+    def score_to_table(self, score, ply):
+        """Mate scores are stored as the distance from the stored node rather than the root"""
+        if score > mate_threshold:
+            return score + ply
+        if score < -mate_threshold:
+            return score - ply
+        return score
+
+    def score_from_table(self, score, ply):
+        if score > mate_threshold:
+            return score - ply
+        if score < -mate_threshold:
+            return score + ply
+        return score
+
+
+def find_best_move(board, max_depth=64, time_limit=None, node_limit=None, hash_mb=16, book=None, tablebase=None):
+    """Searches a board for the best move for the player to move with a fresh search"""
+    return Search(hash_mb=hash_mb, book=book, tablebase=tablebase).search(board, max_depth, time_limit, node_limit)
@@ -0,0 +1,59 @@
+import argparse
+import json
+import subprocess
+import sys
+
+
+# the modules that make up each entry point, and the most time importing them may take, in milliseconds
+startup_budgets = {
+    'core': (['position', 'move', 'piece', 'board'], 40),
+    'engine': (['legal', 'search', 'uci'], 100),
+    'batch': (['batch'], 150),
+}
+
+# modules which are only loaded when a feature that needs them is used
+heavy_modules = ['numpy', 'PyQt5']
+
+# run in a fresh interpreter, so that nothing has been imported or cached yet
+probe_script = '''
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def measure_startup(modules, runs=5):
+    """Imports modules in fresh interpreters, returning the fastest import time in milliseconds
+    and any heavy modules that were loaded along the way"""
+    best, loaded = None, []
+    for _ in range(runs):
+        script = probe_script.format(modules=modules, heavy=heavy_modules)
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        best = result['ms'] if best is None else min(best, result['ms'])
+        loaded = result['loaded']
+    return best, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check that each entry point imports within its startup budget '
+                                                 'and without loading numpy or PyQt5')
+    parser.add_argument('--runs', type=int, default=5, help='the number of fresh interpreters to time each with')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, (modules, budget) in startup_budgets.items():
+        elapsed, loaded = measure_startup(modules, args.runs)
+        ok = elapsed <= budget and not loaded
+        failed = failed or not ok
+        heavy = f'  loaded {", ".join(loaded)}' if loaded else ''
+        print(f'{name:8} {elapsed:8.1f} ms  budget {budget:4d} ms  {"ok" if ok else "FAIL"}{heavy}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,382 @@
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from attacks import king_masks
+from bitboard import piece_attacks, iterate_bits
+from mappedfile import MappedFile
+from search import mate_score
+
+
+# the file starts with a magic string, a format version, the number of entries and the material of the table
+magic: bytes = b'PYCHESTB'
+version: int = 1
+header_format = struct.Struct('<8sII4s')
+
+# the tables cover a strong player with a king and one other piece against a lone king. The strong player is
+# always stored as light, and positions where dark is strong are probed with the colors swapped and the board
+# mirrored. Every position has an entry, indexed by the player to move, then the squares of the strong king,
+# the weak king and the other piece, so an entry is found without searching
+table_size: int = 2 * 64 * 64 * 64
+strong_to_move: int = 0
+weak_to_move: int = 1
+
+# the pieces that can be added to the strong king, and the pieces a pawn promotes to that have their own tables
+table_pieces: str = 'QRBNP'
+promotion_pieces: str = 'QR'
+# a king with only a bishop or a knight can never mate, so these are drawn without a table
+drawn_pieces: str = 'BN'
+
+# each entry is one byte. A win for the player to move is stored as the number of plies until mate, from 1 to 127,
+# a loss as 128 plus the number of plies until mate, and a draw as 0. Impossible positions are stored as 255
+draw_value: int = 0
+loss_value: int = 128
+illegal_value: int = 255
+max_plies: int = 126
+
+
+@dataclass
+class TablebaseResult:
+    """A class for representing the value of a position found in a tablebase"""
+    wdl: int        # 1 if the player to move wins, 0 if it is a draw and -1 if the player to move loses
+    dtm: int        # the number of plies until mate with best play, or 0 for a draw
+
+
+def material_name(code):
+    """Gets the name of the table for a king and a piece against a king, such as KQK"""
+    return f'K{code.upper()}K'
+
+
+def table_index(to_move, strong_king, weak_king, sq):
+    return (((to_move << 6) | strong_king) << 6 | weak_king) << 6 | sq
+
+
+def decode_value(value):
+    """Converts a stored entry into a result, or None if the position is impossible"""
+    if value == illegal_value:
+        return None
+    if value == draw_value:
+        return TablebaseResult(0, 0)
+    if value < loss_value:
+        return TablebaseResult(1, value)
+    return TablebaseResult(-1, value - loss_value)
+
+
+def is_legal(code, strong_king, weak_king, sq, to_move):
+    """Checks if a position can be reached. The pieces must be on different tiles, the kings may not touch,
+    a pawn can't stand on the first or last row and the weak king can't be in check with the strong player to move"""
+    if strong_king == weak_king or strong_king == sq or weak_king == sq:
+        return False
+    if king_masks[strong_king] & (1 << weak_king):
+        return False
+    if code == 'P' and sq >> 3 in (0, 7):
+        return False
+    if to_move == strong_to_move:
+        return not piece_attacks(code, sq, (1 << strong_king) | (1 << weak_king)) & (1 << weak_king)
+    return True
+
+
+def piece_moves(code, strong_king, weak_king, sq):
+    """Gets every tile the strong player's piece can move to. The weak king can never be captured in a legal
+    position, so only empty tiles are returned"""
+    occupied = (1 << strong_king) | (1 << weak_king)
+    if code == 'P':
+        # light pawns move towards row 0, two tiles from their starting row if both are empty
+        targets = []
+        if not occupied & (1 << (sq - 8)):
+            targets.append(sq - 8)
+            if sq >> 3 == 6 and not occupied & (1 << (sq - 16)):
+                targets.append(sq - 16)
+        return targets
+    return list(iterate_bits(piece_attacks(code, sq, occupied) & ~occupied))
+
+
+def piece_unmoves(code, strong_king, weak_king, sq):
+    """Gets every tile the strong player's piece could have moved to its tile from. Every piece but the pawn
+    moves the same way in both directions, while a pawn can only have come from further back"""
+    occupied = (1 << strong_king) | (1 << weak_king)
+    if code == 'P':
+        sources = []
+        if sq >> 3 < 6 and not occupied & (1 << (sq + 8)):
+            sources.append(sq + 8)
+            if sq >> 3 == 4 and not occupied & (1 << (sq + 16)):
+                sources.append(sq + 16)
+        return sources
+    return list(iterate_bits(piece_attacks(code, sq, occupied) & ~occupied))
+
+
+def generate_table(code, promotions=None, log=None):
+    """Builds the table for a king and a piece against a king by retrograde analysis.
+    Checkmates are found first, then every position is resolved in order of its distance to mate by stepping
+    backwards through the moves that lead to positions already resolved. The strong player wins a position if
+    any move reaches a loss for the weak player, and the weak player loses a position once every move reaches
+    a win for the strong player. Captures of the strong player's piece leave a drawn position with two kings.
+    A pawn table needs the tables of the pieces it promotes to, given in promotions by code, and promotion to
+    a piece without a table counts as a draw. Returns the table as a bytearray of entries"""
+    code = code.upper()
+    promotions = promotions or {}
+    values = bytearray(table_size)
+    known = bytearray(table_size)
+    # the number of moves left for the weak player which haven't yet been found to lose
+    remaining = bytearray(table_size)
+
+    # the positions resolved at each distance to mate, starting with checkmates
+    levels = {0: []}
+    for i in range(table_size):
+        to_move, strong_king, weak_king, sq = i >> 18, (i >> 12) & 63, (i >> 6) & 63, i & 63
+        if not is_legal(code, strong_king, weak_king, sq, to_move):
+            values[i], known[i] = illegal_value, 1
+            continue
+
+        if to_move == strong_to_move:
+            if code != 'P' or sq >> 3 != 1:
+                continue
+            # a pawn that promotes wins as quickly as the weak player loses in the table of its new piece
+            for target in piece_moves(code, strong_king, weak_king, sq):
+                for table in promotions.values():
+                    value = table[table_index(weak_to_move, strong_king, weak_king, target)]
+                    if value >= loss_value and value != illegal_value:
+                        levels.setdefault(value - loss_value + 1, []).append(i)
+            continue
+
+        # the weak king may step to any tile not next to the strong king and not attacked by the other piece.
+        # the weak king is left out of the occupancy so that it can't hide behind itself along a slider's ray
+        attacked = king_masks[strong_king] | piece_attacks(code, sq, 1 << strong_king)
+        moves, can_capture = 0, False
+        for target in iterate_bits(king_masks[weak_king] & ~(1 << strong_king)):
+            if target == sq:
+                can_capture = not king_masks[strong_king] & (1 << sq)
+            elif not attacked & (1 << target):
+                moves += 1
+
+        if can_capture:
+            # taking the last piece leaves two kings, which is a draw
+            known[i] = 1
+        elif moves == 0:
+            known[i] = 1
+            if attacked & (1 << weak_king):
+                values[i] = loss_value
+                levels[0].append(i)
+        else:
+            remaining[i] = moves
+
+    plies = 0
+    while levels:
+        frontier = levels.pop(plies, [])
+        resolved = []
+        for i in frontier:
+            if plies > 0 and known[i]:
+                continue
+            if plies > 0:
+                known[i] = 1
+                values[i] = plies if plies & 1 else loss_value + plies
+            resolved.append(i)
+
+        for i in resolved:
+            to_move, strong_king, weak_king, sq = i >> 18, (i >> 12) & 63, (i >> 6) & 63, i & 63
+            if to_move == weak_to_move:
+                # the weak player loses here, so every strong move leading here wins
+                for king in iterate_bits(king_masks[strong_king] & ~king_masks[weak_king] & ~(1 << weak_king)
+                                         & ~(1 << sq)):
+                    previous = table_index(strong_to_move, king, weak_king, sq)
+                    if not known[previous]:
+                        levels.setdefault(plies + 1, []).append(previous)
+                for source in piece_unmoves(code, strong_king, weak_king, sq):
+                    previous = table_index(strong_to_move, strong_king, weak_king, source)
+                    if not known[previous]:
+                        levels.setdefault(plies + 1, []).append(previous)
+            else:
+                # the strong player wins here, so a weak position loses once it has no other way out
+                for king in iterate_bits(king_masks[weak_king] & ~king_masks[strong_king] & ~(1 << strong_king)
+                                         & ~(1 << sq)):
+                    previous = table_index(weak_to_move, strong_king, king, sq)
+                    if known[previous]:
+                        continue
+                    remaining[previous] -= 1
+                    if remaining[previous] == 0:
+                        levels.setdefault(plies + 1, []).append(previous)
+
+        if log is not None and resolved:
+            log(f'{material_name(code)} {len(resolved):7d} positions at {plies} plies')
+        plies += 1
+        if plies > max_plies + 1:
+            raise ValueError(f'{material_name(code)} has a mate longer than {max_plies} plies')
+
+    return values
+
+
+def write_table(path, code, values):
+    with open(path, 'wb') as f:
+        f.write(header_format.pack(magic, version, len(values), material_name(code).encode()))
+        f.write(values)
+
+
+class TableFile(MappedFile):
+    """A class for reading a single table file through a read-only memory map, with an entry for every position"""
+
+    magic = magic
+    version = version
+    header_format = header_format
+    kind = 'a tablebase'
+
+    def check_header(self):
+        return self.count == table_size
+
+    def file_size(self):
+        # a truncated table would only fail when a missing entry is probed, so it is rejected when it is opened
+        return header_format.size + table_size
+
+    @property
+    def material(self):
+        return self.header[3].decode()
+
+    def value(self, i):
+        return self.map[header_format.size + i]
+
+
+class Tablebase:
+    """A class for probing endgame tables. Every table file in a directory is opened, and a position is answered by
+    reading a single entry at an index calculated from the squares of its pieces"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        # each table, by the code of the strong player's other piece
+        self.tables = {}
+        try:
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.tb'):
+                    table = TableFile(os.path.join(directory, name))
+                    self.tables[table.material[1]] = table
+        except BaseException:
+            # the tables opened before an invalid one are closed, rather than left open until they are collected
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+    def probe(self, board):
+        """Gets the value of a board for the player to move, or None if no table covers it"""
+        occupied = board.occupied
+        count = bin(occupied).count('1')
+        if count > 3:
+            return None
+
+        tiles = board.board.tiles
+        kings, other = {}, None
+        for sq in iterate_bits(occupied):
+            piece = tiles[sq]
+            if piece.code in 'kK':
+                kings[piece.isLight] = sq
+            else:
+                other = (sq, piece)
+        if len(kings) != 2:
+            return None
+        # two bare kings can never mate
+        if other is None:
+            return TablebaseResult(0, 0)
+
+        sq, piece = other
+        # a rook that can still castle isn't covered, since the tables assume castling isn't possible
+        if getattr(piece, 'can_castle', False):
+            return None
+        table = self.tables.get(piece.code.upper())
+        if table is None:
+            return TablebaseResult(0, 0) if piece.code.upper() in drawn_pieces else None
+
+        # the tables are stored with light as the strong player, so swap the colors by mirroring the rows
+        isLight = piece.isLight
+        flip = 0 if isLight else 56
+        to_move = strong_to_move if board.isLightTurn == isLight else weak_to_move
+        i = table_index(to_move, kings[isLight] ^ flip, kings[not isLight] ^ flip, sq ^ flip)
+        return decode_value(table.value(i))
+
+    def score(self, board, ply):
+        """Gets the score of a board for the player to move in the same units as the search, where a mate found
+        ply plies from the root is worth less the further away it is, or None if no table covers it"""
+        result = self.probe(board)
+        if result is None:
+            return None
+        if result.wdl > 0:
+            return mate_score - ply - result.dtm
+        if result.wdl < 0:
+            return -mate_score + ply + result.dtm
+        return 0
+
+    def best_move(self, board, moves):
+        """Picks the move which leads to the best value for the player to move, the quickest mate when winning and
+        the slowest when losing. Returns the move and its score, or None if any move leads out of the tables"""
+        best, best_score = None, None
+        for move in moves:
+            board.make_move(move)
+            score = self.score(board, 1)
+            board.unmake_move()
+            if score is None:
+                return None
+            if best_score is None or -score > best_score:
+                best, best_score = move, -score
+        return (best, best_score) if best is not None else None
+
+
+def generate_tables(codes, directory, log=print):
+    """Generates the tables for every piece code into a directory, along with the tables any pawn table needs
+    for its promotions. Tables already in the directory are reused. Returns the paths of the tables"""
+    os.makedirs(directory, exist_ok=True)
+    needed = []
+    for code in codes:
+        code = code.upper()
+        if code not in table_pieces:
+            raise ValueError(f'no table for {material_name(code)}, expected one of {table_pieces}')
+        if code == 'P':
+            needed.extend(promotion_pieces)
+        needed.append(code)
+
+    tables, paths = {}, []
+    for code in dict.fromkeys(needed):
+        path = os.path.join(directory, f'{material_name(code)}.tb')
+        if os.path.exists(path):
+            with TableFile(path) as table:
+                tables[code] = bytearray(table.map[header_format.size:])
+        else:
+            start = time.perf_counter()
+            tables[code] = generate_table(code, {piece: tables[piece] for piece in promotion_pieces if piece in tables})
+            write_table(path, code, tables[code])
+            if log is not None:
+                log(f'wrote {path} in {time.perf_counter() - start:.1f}s')
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    # probing the tables never needs argparse, so it is imported only when tables are generated
+    import argparse
+    parser = argparse.ArgumentParser(description='Generate endgame tables with the win, draw or loss and distance '
+                                                 'to mate of every position with a king and a piece against a king')
+    parser.add_argument('materials', nargs='+', help='the tables to generate, such as KQK KRK KPK')
+    parser.add_argument('--dir', default='tablebases', help='the directory to write the tables to')
+    args = parser.parse_args(argv)
+
+    codes = []
+    for material in args.materials:
+        material = material.upper()
+        if len(material) != 3 or material[0] != 'K' or material[2] != 'K':
+            parser.error(f'expected a table such as KQK, not {material}')
+        codes.append(material[1])
+    generate_tables(codes, args.dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import unittest
+
+
+class TestUCI(unittest.TestCase):
+    """Drives the engine over piped stdin the way a GUI or tournament harness would, keeping stdin open between
+    commands so that the engine is blocked reading it while it searches"""
+
+    def setUp(self):
+        self.engine = None
+        self.start()
+
+    def tearDown(self):
+        self.stop()
+
+    def start(self):
+        # the engine is started from the repository so that the tests can be run from any directory
+        root = os.path.dirname(os.path.abspath(__file__))
+        self.engine = subprocess.Popen([sys.executable, os.path.join(root, 'uci.py')], cwd=root,
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       text=True, start_new_session=True)
+        self.lines = queue.Queue()
+        threading.Thread(target=self.read_lines, daemon=True).start()
+
+    def stop(self):
+        # a hung engine can leave helper processes holding its pipes open, so its whole process group is killed
+        try:
+            os.killpg(self.engine.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.engine.wait()
+        self.engine.stdin.close()
+        self.engine.stdout.close()
+        self.engine.stderr.close()
+
+    def read_lines(self):
+        for line in self.engine.stdout:
+            self.lines.put(line.strip())
+
+    def send(self, *commands):
+        for command in commands:
+            self.engine.stdin.write(command + '\n')
+        self.engine.stdin.flush()
+
+    def expect(self, prefix, timeout=30):
+        """Waits for a line starting with a prefix, failing if the engine doesn't send one in time"""
+        while True:
+            try:
+                line = self.lines.get(timeout=timeout)
+            except queue.Empty:
+                self.fail(f'no {prefix} within {timeout}s')
+            if line.startswith(prefix):
+                return line
+
+    def quit(self):
+        self.send('quit')
+        self.assertEqual(self.engine.wait(timeout=30), 0)
+        return self.engine.stderr.read()
+
+    def test_search(self):
+        self.send('uci')
+        self.expect('uciok')
+        self.send('position startpos moves e2e4', 'go depth 2')
+        self.expect('bestmove ')
+        self.quit()
+
+    def test_threads(self):
+        # the helpers are started while the main thread is blocked reading stdin, which must not stop them working.
+        # whether a helper starts while stdin is locked is down to timing, so several engines are tried
+        for attempt in range(5):
+            if attempt > 0:
+                self.stop()
+                self.start()
+            self.send('uci', 'setoption name Threads value 3', 'position startpos', 'go depth 3')
+            self.expect('bestmove ')
+            self.send('position startpos moves e2e4', 'go depth 2')
+            self.expect('bestmove ')
+            self.assertNotIn('leaked', self.quit())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+from array import array
+from dataclasses import dataclass
+
+
+# what the value stored for a position means
+exact_bound: int = 0    # the value is exact
+lower_bound: int = 1    # the true value is at least the stored value
+upper_bound: int = 2    # the true value is at most the stored value
+
+
+@dataclass
+class Entry:
+    """A class for representing a single result read back from a transposition table"""
+    value: int
+    depth: int
+    bound: int
+    move: int       # a move packed with Move.pack, or -1 if there is none
+
+
+class TranspositionTable:
+    """A fixed size table of results keyed by the zobrist hash of a position.
+    The table is split into buckets of two slots. The first slot keeps whichever entry was searched deepest,
+    while the second is always replaced, so that deep results survive while recent ones are still kept.
+    Entries are stored in typed arrays so that the memory used never grows past the budget it was created with"""
+
+    # the bytes used by each slot: the key, value, move, depth and bound
+    slot_size: int = 8 + 8 + 4 + 1 + 1
+    # filled slots are tracked for up to one in this many slots. Past that the whole table is cleared at once
+    filled_share: int = 16
+
+    def __init__(self, size_mb=16):
+        # each bucket is also charged for its share of the list of filled slots, which holds four bytes per slot
+        bucket_size = 2 * self.slot_size + 2 * 4 / self.filled_share
+        self.buckets = max(1, int(int(size_mb * 1024 * 1024) // bucket_size))
+        slots = 2 * self.buckets
+        self.keys = array('Q', bytes(8 * slots))
+        self.values = array('q', bytes(8 * slots))
+        self.moves = array('i', bytes(4 * slots))
+        # a depth of -1 marks an empty slot
+        self.depths = array('b', [-1]) * slots
+        self.bounds = array('B', bytes(slots))
+        # the slots which have been filled since the table was last cleared, until there are filled_limit of them
+        self.filled = array('I')
+        self.filled_limit = max(1, slots // self.filled_share)
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """Counts the slots which are in use"""
+        if len(self.filled) < self.filled_limit:
+            return len(self.filled)
+        # an empty slot has a depth of -1, which is the byte 0xff
+        return len(self.depths) - self.depths.tobytes().count(b'\xff')
+
+    def clear(self):
+        """Empties every slot and resets the counters. The arrays are reused rather than allocated again, and when
+        only a small part of the table was used just the slots that were filled are emptied, so clearing between
+        short searches costs next to nothing"""
+        if len(self.filled) < self.filled_limit:
+            depths = self.depths
+            for slot in self.filled:
+                depths[slot] = -1
+        else:
+            # an empty slot is only recognised by its depth, so the rest of the slot can be left as it is
+            view = memoryview(self.depths).cast('B')
+            view[:] = b'\xff' * len(view)
+            view.release()
+        self.filled = array('I')
+
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key):
+        """Looks up the entry for a position, returning None if it has not been stored"""
+        slot = (key % self.buckets) * 2
+        for i in (slot, slot + 1):
+            if self.keys[i] == key and self.depths[i] >= 0:
+                self.hits += 1
+                return Entry(self.values[i], self.depths[i], self.bounds[i], self.moves[i])
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth, bound=exact_bound, move=-1):
+        """Stores a result for a position. The depth preferred slot is used if the new result is at least as deep
+        as the one in it or is for the same position, otherwise the always replace slot is overwritten"""
+        slot = (key % self.buckets) * 2
+        if depth < self.depths[slot] and self.keys[slot] != key:
+            slot += 1
+        if self.depths[slot] < 0 and len(self.filled) < self.filled_limit:
+            self.filled.append(slot)
+
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.moves[slot] = move
+        self.depths[slot] = min(depth, 127)
+        self.bounds[slot] = bound
+
+    def hit_rate(self):
+        """The fraction of probes which found an entry"""
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def stats(self):
+        """Summarises the usage of the table"""
+        return {'size_mb': self.buckets * 2 * self.slot_size / (1024 * 1024), 'slots': 2 * self.buckets,
+                'used': len(self), 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate()}
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A transposition table kept in shared memory, so that searches in several processes can read each other's
+    results. Slots are written without a lock, so each key is stored mixed with the rest of its slot and an entry
+    is only read back if the two still agree, which throws away any slot that two processes wrote at once.
+    The process that creates the table owns it and must call unlink once every process is done with it"""
+
+    def __init__(self, size_mb=16, name=None, buckets=None):
+        # only parallel searches need shared memory, so it isn't loaded until one is created
+        from multiprocessing import shared_memory
+        self.buckets = buckets or max(1, int(size_mb * 1024 * 1024) // (2 * self.slot_size))
+        slots = 2 * self.buckets
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=slots * self.slot_size)
+        else:
+            # attaching registers the memory again with the resource tracker, which helpers share with the process
+            # that started them. It is left registered, since unregistering it here would forget the owner's entry
+            # too. The owner unregisters it when it unlinks the memory
+            self.memory = shared_memory.SharedMemory(name=name)
+
+        # views of each field laid out one after another, largest first so that every view is aligned
+        buffer, offset = self.memory.buf, 0
+        views = []
+        for code, width in (('Q', 8), ('q', 8), ('i', 4), ('b', 1), ('B', 1)):
+            views.append(buffer[offset:offset + width * slots].cast(code))
+            offset += width * slots
+        self.keys, self.values, self.moves, self.depths, self.bounds = views
+
+        if name is None:
+            self.clear()
+        else:
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        # an empty slot has a depth of -1, which is the byte 0xff
+        return len(self.depths) - self.depths.tobytes().count(b'\xff')
+
+    def __reduce__(self):
+        # other processes attach to the same memory rather than getting a copy
+        return SharedTranspositionTable, (0, self.memory.name, self.buckets)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def clear(self):
+        """Empties every slot and resets the counters"""
+        self.memory.buf[:len(self.memory.buf)] = bytes(len(self.memory.buf))
+        self.depths[:] = array('b', [-1]) * len(self.depths)
+        self.hits = 0
+        self.misses = 0
+
+    def check(self, i):
+        """Mixes together everything stored in a slot besides its key"""
+        return (self.values[i] & 0xffffffffffffffff) ^ (self.moves[i] & 0xffffffff) << 24 ^ \
+            self.depths[i] << 8 ^ self.bounds[i]
+
+    def probe(self, key):
+        slot = (key % self.buckets) * 2
+        for i in (slot, slot + 1):
+            if self.depths[i] >= 0 and self.keys[i] ^ self.check(i) == key:
+                self.hits += 1
+                return Entry(self.values[i], self.depths[i], self.bounds[i], self.moves[i])
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth, bound=exact_bound, move=-1):
+        slot = (key % self.buckets) * 2
+        if depth < self.depths[slot] and self.keys[slot] ^ self.check(slot) != key:
+            slot += 1
+
+        self.values[slot] = value
+        self.moves[slot] = move
+        self.depths[slot] = min(depth, 127)
+        self.bounds[slot] = bound
+        self.keys[slot] = key ^ self.check(slot)
+
+    def close(self):
+        """Detaches this process from the table"""
+        for view in (self.keys, self.values, self.moves, self.depths, self.bounds):
+            view.release()
+        self.memory.close()
+
+    def unlink(self):
+        """Frees the shared memory once every process has closed it"""
+        self.memory.unlink()
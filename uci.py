@@ -0,0 +1,261 @@
+import sys
+import threading
+from board import Board
+from book import OpeningBook
+from tablebase import Tablebase
+from fen import read_fen, move_name
+from legal import generate_legal_moves
+from search import Search, mate_score, mate_threshold, max_ply
+
+
+engine_name: str = 'PyChess'
+engine_author: str = 'Flouid'
+
+# the options the engine accepts, with their defaults and bounds
+default_hash: int = 16
+max_hash: int = 1024
+default_threads: int = 1
+max_threads: int = 64
+default_own_book: bool = True
+
+# the share of the remaining clock spent on a move when the time is given as a clock rather than a movetime,
+# unless the number of moves until the next time control is given
+moves_to_go: int = 30
+# the most of the remaining clock a single move may use, so that an increment never makes it overrun the clock
+max_clock_share: float = 0.8
+
+
+def parse_move(board, name):
+    """Finds the legal move on a board for the player to move with a long algebraic name, such as e2e4"""
+    for move in generate_legal_moves(board, board.isLightTurn):
+        if move_name(move) == name:
+            return move
+    raise ValueError(f'illegal move {name}')
+
+
+def format_score(score):
+    """Writes a score the way UCI expects, in centipawns or as the number of moves until mate"""
+    if score > mate_threshold:
+        return f'mate {(mate_score - score + 1) // 2}'
+    if score < -mate_threshold:
+        return f'mate {-((mate_score + score + 1) // 2)}'
+    return f'cp {score}'
+
+
+class UCIEngine:
+    """A class for speaking the universal chess interface over a pair of text streams, so that the engine can be
+    driven by a GUI or a tournament harness without a display. Searches run on a background thread so that stop
+    and isready are answered while the engine is thinking"""
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.board = Board()
+        self.hash_mb = default_hash
+        self.threads = default_threads
+        # the opening book is only used once a book file has been given
+        self.own_book = default_own_book
+        self.book = None
+        self.tablebase = None
+        self.search = None
+        self.thread = None
+
+    def send(self, line):
+        self.out.write(line + '\n')
+        self.out.flush()
+
+    def searcher(self):
+        """Gets the search for the current options, creating it if the options have changed"""
+        if self.search is None:
+            book = self.book if self.own_book else None
+            if self.threads > 1:
+                # multiprocessing is slow to import, so it is only loaded once more than one thread is asked for
+                from parallel import ParallelSearch
+                self.search = ParallelSearch(self.threads, self.hash_mb, book, self.tablebase)
+            else:
+                self.search = Search(hash_mb=self.hash_mb, book=book, tablebase=self.tablebase)
+        return self.search
+
+    def reset_search(self):
+        """Throws away the search so that it is recreated with the current options"""
+        self.wait()
+        if hasattr(self.search, 'close'):
+            self.search.close()
+        self.search = None
+
+    def handle(self, line):
+        """Handles a single command, returning False once the engine should quit"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == 'uci':
+            self.send(f'id name {engine_name}')
+            self.send(f'id author {engine_author}')
+            self.send(f'option name Hash type spin default {default_hash} min 1 max {max_hash}')
+            self.send(f'option name Threads type spin default {default_threads} min 1 max {max_threads}')
+            self.send(f'option name OwnBook type check default {str(default_own_book).lower()}')
+            self.send('option name BookFile type string default <empty>')
+            self.send('option name TablebasePath type string default <empty>')
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'ucinewgame':
+            self.wait()
+            if self.search is not None:
+                self.search.table.clear()
+            self.board = Board()
+        elif command == 'position':
+            self.set_position(args)
+        elif command == 'go':
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            self.reset_search()
+            self.set_book(None)
+            self.set_tablebase(None)
+            return False
+        else:
+            self.send(f'info string unknown command {command}')
+        return True
+
+    def set_option(self, args):
+        """Reads setoption name <name> value <value>"""
+        if 'name' not in args or 'value' not in args:
+            return
+        name = ' '.join(args[args.index('name') + 1:args.index('value')]).lower()
+        value = ' '.join(args[args.index('value') + 1:])
+        try:
+            if name == 'hash':
+                self.hash_mb = min(max(int(value), 1), max_hash)
+            elif name == 'threads':
+                self.threads = min(max(int(value), 1), max_threads)
+            elif name == 'ownbook':
+                self.own_book = value.lower() == 'true'
+            elif name == 'bookfile':
+                # the search holds the book, so it is thrown away before the book is closed
+                self.reset_search()
+                self.set_book(value if value and value != '<empty>' else None)
+            elif name == 'tablebasepath':
+                self.reset_search()
+                self.set_tablebase(value if value and value != '<empty>' else None)
+            else:
+                self.send(f'info string unknown option {name}')
+                return
+        except (ValueError, OSError) as e:
+            self.send(f'info string bad value {value} for {name}: {e}')
+            return
+        self.reset_search()
+
+    def set_book(self, path):
+        """Closes the current opening book and opens the one at a path, or none if the path is None"""
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if path is not None:
+            self.book = OpeningBook(path)
+
+    def set_tablebase(self, directory):
+        """Closes the current tablebase and opens the tables in a directory, or none if the directory is None"""
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
+        if directory is not None:
+            self.tablebase = Tablebase(directory)
+
+    def set_position(self, args):
+        """Reads position startpos [moves ...] or position fen <fen> [moves ...]"""
+        self.wait()
+        moves = args.index('moves') if 'moves' in args else len(args)
+        try:
+            if args and args[0] == 'startpos':
+                board = Board()
+            elif args and args[0] == 'fen':
+                board = read_fen(' '.join(args[1:moves]))
+            else:
+                self.send('info string expected startpos or fen')
+                return
+            for name in args[moves + 1:]:
+                board.make_move(parse_move(board, name))
+        except (ValueError, IndexError, KeyError) as e:
+            self.send(f'info string bad position: {e}')
+            return
+        self.board = board
+
+    def go(self, args):
+        """Reads the limits for a search and starts it on a background thread"""
+        self.wait()
+        limits = {}
+        for i, token in enumerate(args[:-1]):
+            if token in ('depth', 'movetime', 'nodes', 'wtime', 'btime', 'winc', 'binc', 'movestogo'):
+                try:
+                    limits[token] = int(args[i + 1])
+                except ValueError:
+                    pass
+
+        # the search can't go past max_ply, so deeper requests are searched as deep as it can go
+        max_depth = max(1, min(limits.get('depth', 64), max_ply - 1))
+        node_limit = limits.get('nodes')
+        time_limit = None
+        if 'movetime' in limits:
+            time_limit = limits['movetime'] / 1000
+        elif 'wtime' in limits or 'btime' in limits:
+            clock = limits.get('wtime' if self.board.isLightTurn else 'btime', 0)
+            increment = limits.get('winc' if self.board.isLightTurn else 'binc', 0)
+            moves = max(limits.get('movestogo', moves_to_go), 1)
+            budget = max(clock / moves + increment / 2, 10)
+            time_limit = min(budget, clock * max_clock_share) / 1000
+
+        # the search makes and takes back moves on the board, so it gets its own
+        board = Board(str(self.board), self.board.isLightTurn)
+        board.history = list(self.board.history)
+        search = self.searcher()
+        self.thread = threading.Thread(target=self.run_search, args=(search, board, max_depth, time_limit, node_limit),
+                                       daemon=True)
+        self.thread.start()
+
+    def run_search(self, search, board, max_depth, time_limit, node_limit):
+        result = search.search(board, max_depth, time_limit, node_limit, self.send_info)
+        self.send(f'bestmove {move_name(result.move) if result.move is not None else "0000"}')
+
+    def send_info(self, result):
+        nps = int(result.nodes / result.elapsed) if result.elapsed > 0 else 0
+        pv = ' '.join(move_name(move) for move in result.pv)
+        self.send(f'info depth {result.depth} score {format_score(result.score)} nodes {result.nodes} nps {nps} '
+                  f'time {int(result.elapsed * 1000)} pv {pv}')
+
+    def wait(self):
+        """Waits for the running search to finish. Like other engines, a command that changes the position or the
+        options waits for the search rather than interrupting it, and only stop cuts a search short"""
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def stop(self):
+        """Stops the running search, which still sends its best move, and waits for it to finish"""
+        if self.thread is not None:
+            # a search that hasn't started yet would miss the request, so keep asking until the thread finishes
+            while self.thread.is_alive():
+                self.search.stop()
+                self.thread.join(0.01)
+            self.thread = None
+
+
+def main():
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stop()
+    engine.reset_search()
+    engine.set_book(None)
+    engine.set_tablebase(None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import os
+from PyQt5.QtWidgets import QWidget, QVBoxLayout
+from PyQt5.QtGui import QPainter, QPixmap, QColor
+from PyQt5.QtCore import QRect, QPoint, Qt
+from position import Position
+from move import Move
+from board import Board
+from engine import Engine
+from movecache import MoveCache
+from book import OpeningBook
+
+
+class ChessUI(QWidget):
+    # sets the default color scheme for the app
+    background_color = '#cccccc'
+    light_color = '#a0a0a0'
+    dark_color = '#353535'
+    hint_color = '#40a040'
+
+    # load the icon for a targetable tile
+    target_icon: str = './chess_icons/green_circle.png'
+
+    # the opening book the engine plays from, built with book.py. The engine searches every move if it is missing
+    book_file: str = './book.bin'
+
+    # the icon for each piece code, kept here since only the UI needs them
+    piece_images = {'r': './chess_icons/dr.png', 'n': './chess_icons/dkn.png', 'b': './chess_icons/db.png',
+                    'q': './chess_icons/dq.png', 'k': './chess_icons/dk.png', 'p': './chess_icons/dp.png',
+                    'R': './chess_icons/lr.png', 'N': './chess_icons/lkn.png', 'B': './chess_icons/lb.png',
+                    'Q': './chess_icons/lq.png', 'K': './chess_icons/lk.png', 'P': './chess_icons/lp.png'}
+
+    # size parameters for the app
+    height = 600
+    width = 600
+    box_size = 60
+    height_offset = (height - box_size * 8) // 2
+    width_offset = (width - box_size * 8) // 2
+
+    # tracks game parameters
+    board = Board()             # the current board state
+    pickup: Position = None     # the coordinates to the held piece
+    ghost: Position = None      # the tile the held piece is being dragged over
+    isLightTurn: bool = True    # tracks if it is the light player's turn
+    engine_plays: bool = None   # the color the engine plays, True for light, or None if two people are playing
+    hint: Move = None           # the move suggested by the engine, if the player asked for one
+
+    # a variable for tracking all of the possible moves
+    moves: list = []
+
+    def __init__(self):
+        # call the parent constructor for a qwidget
+        super(ChessUI, self).__init__()
+        # lock in a size for the window and give it a nice name
+        self.resize(self.height, self.width)
+        self.setWindowTitle('PyChess')
+
+        # create an empty layout and set it as the default
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        # create the background with the board already drawn on it, since it never changes
+        self.pix = QPixmap(self.rect().size())
+        self.pix.fill(QColor(self.background_color))
+        painter = QPainter(self.pix)
+        self.draw_board(painter)
+        painter.end()
+
+        # load every image once up front rather than from disk on every paint
+        self.pixmaps = {code: QPixmap(path) for code, path in self.piece_images.items()}
+        self.target_pixmap = QPixmap(self.target_icon).scaledToWidth((self.box_size * 3) // 5)
+
+        # positions seen before, such as after a piece is dropped back where it started, reuse their moves
+        self.move_cache = MoveCache()
+
+        # start the engine, which works on a background thread and delivers its results through signals
+        self.book = OpeningBook(self.book_file) if os.path.exists(self.book_file) else None
+        self.engine = Engine(book=self.book)
+        self.engine.moves_ready.connect(self.receive_moves)
+        self.engine.hint_ready.connect(self.receive_hint)
+        self.engine.reply_ready.connect(self.receive_reply)
+
+        # generate all of the first possible moves
+        self.generate_moves()
+        if self.engine_plays == self.isLightTurn:
+            self.engine.find_reply(self.board)
+
+    def closeEvent(self, event):
+        """Stops the engine before the window closes"""
+        self.engine.shutdown()
+        if self.book is not None:
+            self.book.close()
+        super(ChessUI, self).closeEvent(event)
+
+    def keyPressEvent(self, event):
+        """Pressing H asks the engine for a hint, which is highlighted once it arrives"""
+        if event.key() == Qt.Key_H and self.engine_plays != self.isLightTurn:
+            self.engine.find_hint(self.board)
+
+    def paintEvent(self, event):
+        """Draws each layer of the board one after another every update"""
+        # initialize the painter and draw the background, which already has the board on it.
+        # only the area that needs to be repainted is drawn, and anything drawn outside of it is clipped
+        painter = QPainter(self)
+        painter.drawPixmap(event.rect(), self.pix, event.rect())
+
+        # draw the pieces to the screen
+        self.draw_pieces(painter, event.rect())
+        # draw piece ghosts to the screen
+        self.draw_ghosts(painter)
+        # draw target icons to the screen
+        self.draw_targets(painter)
+        # draw the hint to the screen
+        self.draw_hint(painter)
+
+    def mousePressEvent(self, event):
+        """When the user clicks the mouse, the game checks if the user can pick up a piece and does so"""
+        # get the pixel position of the click
+        x, y = event.pos().x(), event.pos().y()
+        
+        # if the click is outside the board, do nothing
+        if x < self.width_offset or x >= self.width - self.width_offset:
+            return
+        elif y < self.height_offset or y >= self.height - self.height_offset:
+            return
+        else:
+            # calculate which square the user clicked on
+            pos = self.pixels_to_rowcol(x, y)
+
+            # do nothing if the user clicked on empty space or a piece of the wrong color
+            if self.board.board[pos.r, pos.c] is None or self.board.board[pos.r, pos.c].isLight != self.isLightTurn:
+                return
+            # the engine's pieces can't be picked up
+            if self.engine_plays == self.isLightTurn:
+                return
+
+            # store the position of the picked up piece
+            self.pickup = pos
+        
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        """When the user releases the mouse, the game clears any existing ghosts,
+        drops any held pieces, and makes a move if possible"""
+        # clear any existing ghost
+        self.ghost = None
+
+        # if the user was not holding a piece, do nothing
+        if self.pickup is None:
+            return
+
+        # get the pixel position of the dropped piece
+        x, y = event.pos().x(), event.pos().y()
+
+        # only drop the piece if the target location is on the board
+        if (self.width_offset <= x < self.width - self.width_offset) and \
+            (self.height_offset <= y < self.height - self.height_offset):
+            # get the coordinates of the drop position
+            pos = self.pixels_to_rowcol(x, y)
+
+            # confirm that the user choose a valid move and execute it
+            move = Move(self.pickup, pos)
+            for m in self.moves:
+                if m == move and self.is_valid_move(m):
+                    self.execute_move(m)
+                    break
+
+        # clear the picked up piece
+        self.pickup = None
+
+        self.update()
+
+    def mouseMoveEvent(self, event):
+        """When the user moves the mouse, checks if they are holding a piece.
+        If so, place a ghost on the tile that the player is mousing over."""
+        if self.pickup is not None:
+            # get the pixel position of the click
+            x, y = event.pos().x(), event.pos().y()
+
+            # there is no ghost while mousing outside the board
+            pos = None
+            if self.width_offset <= x < self.width - self.width_offset and \
+                    self.height_offset <= y < self.height - self.height_offset:
+                # calculate the coordinates of the current tile
+                pos = self.pixels_to_rowcol(x, y)
+
+            # most moves stay within the same tile, which needs no repaint at all. positions are shared, so the
+            # same tile is always the same object
+            if pos is self.ghost:
+                return
+
+            # only repaint the tile the ghost left and the tile it moved to
+            for tile in (self.ghost, pos):
+                if tile is not None:
+                    self.update(self.tile_rect(tile.r, tile.c))
+            self.ghost = pos
+
+    def draw_board(self, painter):
+        """Draw the chessboard using the painter"""
+        for r in range(8):
+            x = self.height_offset + self.box_size * r      # height offset
+            for c in range(8):
+                y = self.width_offset + self.box_size * c   # width offset
+                rect = QRect(x, y, self.box_size, self.box_size)
+
+                # the coloring of the square can be determined using the parity of the sum of the indices
+                if (r + c) & 1:
+                    color = QColor(self.dark_color)
+                else:
+                    color = QColor(self.light_color)
+
+                painter.fillRect(rect.normalized(), color)
+
+    def draw_pieces(self, painter, area):
+        """Draw the pieces on the chessboard using the painter, skipping any tile outside of the area being repainted"""
+        for r in range(8):
+            for c in range(8):
+                # only consider pieces that exist
+                if self.board.board[r, c] is not None:
+                    # if a piece is held, don't draw it either
+                    if self.pickup is not None and self.pickup == Position(r, c):
+                        continue
+                    if not area.intersects(self.tile_rect(r, c)):
+                        continue
+                    # get the origin for the box the piece is in
+                    x, y = self.rowcol_to_pixels(r, c)
+                    # draw the image for the piece at the calculated coordinates
+                    painter.drawPixmap(QPoint(x, y), self.pixmaps[self.board.board[r, c].code])
+
+    def draw_ghosts(self, painter):
+        """Draw the ghost created by the player dragging a piece using the painter"""
+        # lower the opacity since ghosts shouldn't look like real pieces
+        painter.setOpacity(0.5)
+
+        # if the tile contains a ghost, then draw the held piece there
+        if self.ghost is not None and self.pickup is not None:
+            x, y = self.rowcol_to_pixels(self.ghost.r, self.ghost.c)
+            painter.drawPixmap(QPoint(x, y), self.pixmaps[self.board.board[self.pickup.r, self.pickup.c].code])
+
+    def draw_targets(self, painter):
+        """Draw a distinctive highlight on every tile that the held piece can move to"""
+        # lower the opacity since highlights should be subtle
+        painter.setOpacity(0.4)
+
+        # if nothing is currently held, don't draw anything
+        if self.pickup is None:
+            return
+
+        # iterate over every move that was calculated
+        for move in self.moves:
+            # only consider moves that belong to the held piece
+            if move.begin != self.pickup:
+                continue
+
+            # calculate the pixel coordinates of the target
+            x, y = self.rowcol_to_pixels(move.target.r, move.target.c)
+            # the icon was scaled to take up a portion of the tile when it was loaded
+            scaledPadding = self.box_size // 5
+            # draw the target icon on the potential landing space
+            painter.drawPixmap(QPoint(x + scaledPadding, y + scaledPadding), self.target_pixmap)
+
+    def draw_hint(self, painter):
+        """Highlight the tiles that the suggested move goes from and to"""
+        painter.setOpacity(0.4)
+
+        if self.hint is None:
+            return
+
+        for pos in (self.hint.begin, self.hint.target):
+            x, y = self.rowcol_to_pixels(pos.r, pos.c)
+            painter.fillRect(QRect(x, y, self.box_size, self.box_size), QColor(self.hint_color))
+
+    def pixels_to_rowcol(self, x, y):
+        """Gets the row and column values for the indices correlated to the pixel values x and y"""
+        c = (x - self.width_offset) // self.box_size
+        r = (y - self.height_offset) // self.box_size
+        return Position(r, c)
+
+    def rowcol_to_pixels(self, r, c):
+        """Gets the pixel values of the origin on the box that a set of row-column indices points to"""
+        x = c * self.box_size + self.width_offset
+        y = r * self.box_size + self.width_offset
+        return x, y
+
+    def tile_rect(self, r, c):
+        """Gets the rectangle of pixels covered by a tile"""
+        x, y = self.rowcol_to_pixels(r, c)
+        return QRect(x, y, self.box_size, self.box_size)
+
+    def is_valid_move(self, move):
+        return move in self.moves
+
+    def execute_move(self, move):
+        """Execute a move by mutating the board state and performing any accompanying state changes"""
+        # anything the engine is still working on is for the old position
+        self.engine.cancel()
+        self.hint = None
+
+        self.board.make_move(move)
+
+        # change the active player color
+        self.isLightTurn = self.board.isLightTurn
+
+        # generate a new set of moves, and let the engine reply if it is its turn
+        self.generate_moves()
+        if self.engine_plays == self.isLightTurn:
+            self.engine.find_reply(self.board)
+
+    def generate_moves(self):
+        """Gets all of the legal moves for the current player from the cache, or asks the engine for them if the
+        position hasn't been seen. The moves list is empty until they arrive, which is well before the player can
+        drag a piece anywhere"""
+        moves = self.move_cache.lookup(self.board)
+        if moves is not None:
+            self.moves = moves
+            return
+        self.moves = []
+        self.engine.generate_moves(self.board)
+
+    def receive_moves(self, moves):
+        # stale results are dropped by the engine, so these are always the moves for the current board
+        self.move_cache.store(self.board, moves)
+        self.moves = moves
+        self.update()
+
+    def receive_hint(self, result):
+        self.hint = result.move
+        self.update()
+
+    def receive_reply(self, result):
+        if result.move is not None:
+            self.execute_move(result.move)
+        self.update()
@@ -0,0 +1,39 @@
+import random
+from bitboard import piece_codes
+
+
+# keys are drawn from a fixed seed so that every process agrees on the hash of a position
+_random = random.Random(20221018)
+
+# a key for every piece code on every square
+piece_keys = {code: [_random.getrandbits(64) for _ in range(64)] for code in piece_codes}
+# a key for the dark player being the one to move
+dark_to_move_key = _random.getrandbits(64)
+# a key for each column that a pawn capturable with en passant can be in
+ep_keys = [_random.getrandbits(64) for _ in range(8)]
+# a key for each square that a rook which can still castle can be on
+castle_keys = [_random.getrandbits(64) for _ in range(64)]
+
+
+def tile_key(piece, sq):
+    """Gets the combined key for a piece and its state on a square, or zero for an empty tile"""
+    if piece is None:
+        return 0
+    if piece.code in 'rR' and piece.can_castle:
+        return piece_keys[piece.code][sq] ^ castle_keys[sq]
+    return piece_keys[piece.code][sq]
+
+
+def hash_board(board):
+    """Calculates the zobrist hash of a board from scratch. Boards keep their hash up to date as moves are made,
+    so this is only needed when a board is first read"""
+    h = 0 if board.isLightTurn else dark_to_move_key
+
+    for r in range(8):
+        for c in range(8):
+            h ^= tile_key(board.board[r, c], r * 8 + c)
+
+    if board.ep_square is not None:
+        h ^= ep_keys[board.ep_square.c]
+
+    return h